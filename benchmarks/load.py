@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""Replays request mixes against a large synthetic rules registry.
+
+The registry holds ``--permissions`` permissions per synthetic model, composed
+of random predicate trees up to ``--depth`` levels deep. The requests are sent
+in-process using the test client by ``--concurrency`` threads, which report
+the throughput, the latency percentiles and the memory usage::
+
+    $ python benchmarks/load.py                          # defaults
+    $ python benchmarks/load.py --models 20 --permissions 500 --depth 12
+    $ python benchmarks/load.py --concurrency 1 4 16 --trace-memory
+
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from os import environ
+from os.path import abspath, dirname, join
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def setup(database):
+    project_dir = dirname(dirname(abspath(__file__)))
+
+    # setup path
+    sys.path.insert(0, project_dir)  # project dir
+    sys.path.insert(0, join(project_dir, 'tests'))  # tests dir
+
+    environ['DJANGO_SETTINGS_MODULE'] = 'testapp.settings'
+
+    # the threads share a database file, each in-memory database being
+    # private to its connection
+    from django.conf import settings
+    settings.DATABASES['default']['TEST'] = {'NAME': database}
+
+    from django import setup
+    setup()
+
+    # the denied requests are expected
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+
+    # setup db
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def populate(rng, synthetic_models, users, objects):
+    for model in synthetic_models:
+        model.objects.bulk_create(
+            model(owner=rng.choice(users), level=rng.randint(0, 5),
+                  public=rng.random() < 0.3)
+            for _ in range(objects))
+
+
+def create_users(count):
+    from django.contrib.auth.models import User
+
+    # a few staff users, the others being regular users
+    return [User.objects.create(username='user{}'.format(index),
+                                is_staff=index % 10 == 0)
+            for index in range(count)]
+
+
+def get_requests(rng, synthetic_models, users, count, mix, anonymous):
+    """Returns the list of the (path, user) of the requests, ``user`` being
+    ``None`` for anonymous requests.
+    """
+    kinds = [kind for kind, weight in mix.items() for _ in range(weight)]
+    pks = {model: list(model.objects.values_list('pk', flat=True))
+           for model in synthetic_models}
+    requests = []
+    for _ in range(count):
+        model = rng.choice(synthetic_models)
+        kind = rng.choice(kinds)
+        path = '/{}/{}/'.format(model.__name__.lower(), kind)
+        if kind == 'mixin':
+            path += '{}/'.format(rng.choice(pks[model]))
+        user = None if rng.random() < anonymous else rng.choice(users)
+        requests.append((path, user))
+    return requests
+
+
+def replay(requests, latencies, statuses):
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    try:
+        for path, user in requests:
+            client.force_authenticate(user)
+            start = perf_counter()
+            response = client.get(path)
+            latencies.append((perf_counter() - start) * 1000)
+            statuses[response.status_code] += 1
+    finally:
+        connections.close_all()
+
+
+def run(requests, concurrency):
+    """Replays the requests using ``concurrency`` threads and returns the
+    duration in seconds, the latencies in milliseconds and the statuses.
+    """
+    # each thread records its own results, which are merged afterwards
+    results = [([], Counter()) for _ in range(concurrency)]
+    threads = [threading.Thread(target=replay,
+                                args=(requests[index::concurrency], ) +
+                                results[index])
+               for index in range(concurrency)]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = perf_counter() - start
+
+    latencies = []
+    statuses = Counter()
+    for thread_latencies, thread_statuses in results:
+        latencies.extend(thread_latencies)
+        statuses.update(thread_statuses)
+    return duration, sorted(latencies), statuses
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def get_max_rss():
+    # in MiB, the unit of ru_maxrss is KiB on linux and bytes on macos
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in ('mixin', 'decorator', 'filtered'):
+            raise argparse.ArgumentTypeError('unknown kind {!r}'.format(kind))
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models', type=int, default=10)
+    parser.add_argument('--permissions', type=int, default=200,
+                        help='number of permissions per model')
+    parser.add_argument('--depth', type=int, default=8,
+                        help='maximal depth of the predicate trees')
+    parser.add_argument('--required', type=int, default=3,
+                        help='number of (object) permissions per view')
+    parser.add_argument('--objects', type=int, default=50,
+                        help='number of objects per model')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--anonymous', type=float, default=0.2,
+                        help='share of anonymous requests (default: 0.2)')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--mix', type=parse_mix,
+                        default='mixin=3,decorator=2,filtered=1',
+                        help='weights of the kinds of views')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4],
+                        help='numbers of threads sending the requests')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='measure the allocations using tracemalloc '
+                             '(slows down the requests)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup(join(directory, 'load.sqlite3'))
+        return load(args)
+
+
+def load(args):
+    from django.test.utils import override_settings
+    from benchmarks import synthetic
+
+    if args.trace_memory:
+        tracemalloc.start()
+    rng = random.Random(args.seed)
+
+    start = perf_counter()
+    synthetic_models = synthetic.create_models(args.models)
+    registry = synthetic.register_permissions(rng, synthetic_models,
+                                              args.permissions, args.depth)
+    print('registry: {} permissions, generated in {:.3f}s'.format(
+        args.models * args.permissions, perf_counter() - start))
+    if args.trace_memory:
+        print('registry memory: {:.1f} MiB'.format(
+            tracemalloc.get_traced_memory()[0] / 1024 / 1024))
+
+    users = create_users(args.users)
+    populate(rng, synthetic_models, users, args.objects)
+    # the views preferably require permissions which regular users have
+    urlconf = synthetic.create_urlconf(rng, registry, args.required,
+                                       users[-1])
+    requests = get_requests(rng, synthetic_models, users, args.requests,
+                            args.mix, args.anonymous)
+
+    print('{:>11} {:>12} {:>9} {:>9} {:>9} {:>9}  {}'.format(
+        'concurrency', 'req/s', 'p50', 'p95', 'p99', 'max', 'statuses'))
+    with override_settings(ROOT_URLCONF=urlconf):
+        for concurrency in args.concurrency:
+            if args.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+                # python >= 3.9, the peak includes the former runs otherwise
+                tracemalloc.reset_peak()
+            duration, latencies, statuses = run(requests, concurrency)
+            print('{:>11} {:>12.1f} {:>7.3f}ms {:>7.3f}ms {:>7.3f}ms '
+                  '{:>7.3f}ms  {}'.format(
+                      concurrency, len(latencies) / duration,
+                      percentile(latencies, 0.5), percentile(latencies, 0.95),
+                      percentile(latencies, 0.99), latencies[-1],
+                      ', '.join('{}: {}'.format(status, count)
+                                for status, count in sorted(statuses.items()))))
+            if args.trace_memory:
+                print('{:>11} peak memory: {:.1f} MiB'.format(
+                    '', tracemalloc.get_traced_memory()[1] / 1024 / 1024))
+
+    max_rss = get_max_rss()
+    if max_rss is not None:
+        print('max rss: {:.1f} MiB'.format(max_rss))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Measures the overhead of the permission checks per request.
+
+Each scenario dispatches requests to a view (using the permission checks of
+rest_framework_rules or none at all) and reports the median and the 95th
+percentile of the latency and the number of queries per request::
+
+    $ python benchmarks/run.py                # run all scenarios
+    $ python benchmarks/run.py --save         # store the results as baseline
+    $ python benchmarks/run.py --compare      # compare against the baseline
+
+"""
+
+import argparse
+import json
+import sys
+from os import environ
+from os.path import abspath, dirname, exists, join
+from time import perf_counter
+
+
+BASELINES = join(dirname(abspath(__file__)), 'baselines.json')
+
+
+def setup():
+    project_dir = dirname(dirname(abspath(__file__)))
+
+    # setup path
+    sys.path.insert(0, project_dir)  # project dir
+    sys.path.insert(0, join(project_dir, 'tests'))  # tests dir
+
+    environ['DJANGO_SETTINGS_MODULE'] = 'testapp.settings'
+
+    from django import setup
+    setup()
+
+    # setup db
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def get_scenarios(books):
+    from benchmarks import views
+
+    yield 'plain', views.PlainView.as_view(), {}
+    yield 'plain-generic', views.PlainGenericView.as_view(), {'pk': books[0].pk}
+
+    for kind in ('attribute', 'query'):
+        for count, depth in ((1, 1), (5, 1), (20, 1), (1, 4), (1, 16)):
+            perms = views.register_permissions(count, depth, kind)
+            suffix = '{}-{}x{}'.format(kind, count, depth)
+            viewset = views.route_viewset(perms)
+            yield ('mixin-' + suffix,
+                   views.mixin_view(perms).as_view(), {})
+            yield ('decorator-' + suffix,
+                   views.decorated_view(perms).as_view(), {})
+            yield ('list_route-' + suffix,
+                   views.route_view(viewset, 'listed'), {})
+            yield ('mixin-generic-' + suffix,
+                   views.mixin_generic_view(perms).as_view(),
+                   {'pk': books[0].pk})
+            yield ('detail_route-' + suffix,
+                   views.route_view(viewset, 'detailed'), {'pk': books[0].pk})
+
+    perms = views.register_permissions(1, 1, 'attribute')
+    yield 'plain-list-{}'.format(len(books)), views.PlainListView.as_view(), {}
+    yield ('filtered-list-{}'.format(len(books)),
+           views.filtered_list_view(perms).as_view(), {})
+
+
+def measure(view, kwargs, user, iterations, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    factory = APIRequestFactory()
+    durations = []
+    queries = 0
+    for iteration in range(warmup + iterations):
+        request = factory.get('/')
+        force_authenticate(request, user)
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            response = view(request, **kwargs)
+            response.render()
+            duration = perf_counter() - start
+        assert response.status_code == 200, response.data
+        if iteration >= warmup:
+            durations.append(duration * 1000)
+            queries = len(context.captured_queries)
+
+    durations.sort()
+    return {
+        'median': durations[len(durations) // 2],
+        'p95': durations[int(len(durations) * 0.95)],
+        'queries': queries,
+    }
+
+
+def compare(results, baselines, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if (result['median'] > baseline['median'] * (1 + tolerance) or
+                result['queries'] > baseline['queries']):
+            regressions.append(
+                '{}: {:.3f}ms / {} queries (baseline {:.3f}ms / {} queries)'
+                .format(name, result['median'], result['queries'],
+                        baseline['median'], baseline['queries']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--objects', type=int, default=100,
+                        help='number of objects listed by the list views')
+    parser.add_argument('--save', action='store_true',
+                        help='store the results as baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='fail on regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='tolerated relative slowdown (default: 0.2)')
+    args = parser.parse_args()
+    if args.compare and not args.save and not exists(BASELINES):
+        # the baselines depend on the machine, they are not committed
+        parser.error('no baseline to compare against at {}, store one using '
+                     '--save first'.format(BASELINES))
+
+    setup()
+
+    from django.contrib.auth.models import User
+    from testapp.models import Book
+
+    user = User.objects.create_user('anton')
+    books = [Book.objects.create(title='Book {}'.format(index), author=user)
+             for index in range(args.objects)]
+
+    results = {}
+    for name, view, kwargs in get_scenarios(books):
+        results[name] = measure(view, kwargs, user,
+                                args.iterations, args.warmup)
+        print('{:<40} {:>9.3f}ms {:>9.3f}ms {:>4} queries'.format(
+            name, results[name]['median'], results[name]['p95'],
+            results[name]['queries']))
+
+    if args.save:
+        with open(BASELINES, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(BASELINES) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
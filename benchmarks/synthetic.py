@@ -0,0 +1,199 @@
+from __future__ import absolute_import
+
+import types
+
+import rules
+from django.conf import settings
+from django.conf.urls import url
+from django.db import connection, models
+from rest_framework import serializers
+from rest_framework.generics import GenericAPIView, ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.filters import ObjectPermissionsFilter
+from rest_framework_rules.mixins import PermissionRequiredMixin
+
+
+# Models
+
+def create_models(count):
+    """Creates ``count`` models (and their tables) whose objects have an
+    owner, a level and a public flag.
+    """
+    created = []
+    for index in range(count):
+        name = 'Synthetic{}'.format(index)
+        model = type(name, (models.Model, ), {
+            '__module__': __name__,
+            'Meta': type('Meta', (), {'app_label': 'benchmarks'}),
+            'owner': models.ForeignKey(settings.AUTH_USER_MODEL,
+                                       on_delete=models.CASCADE,
+                                       related_name='+'),
+            'level': models.IntegerField(),
+            'public': models.BooleanField(default=False),
+        })
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+        created.append(model)
+    return created
+
+
+# Predicates
+
+def user_predicates():
+    # predicates not taking a target, checking attributes of the user
+    return [rules.is_authenticated, rules.is_active, rules.is_staff]
+
+
+def object_predicates(model, levels=4):
+    """Returns predicates taking an object of the model: attribute checks and
+    a predicate querying the database.
+    """
+    def is_owner(user, target):
+        return target.owner_id == user.pk
+
+    def is_public(user, target):
+        return target.public
+
+    def owns_any(user, target):
+        return model.objects.filter(owner_id=user.pk).exists()
+
+    predicates = [
+        rules.predicate(is_owner,
+                        name='{}.is_owner'.format(model.__name__)),
+        rules.predicate(is_public,
+                        name='{}.is_public'.format(model.__name__)),
+        rules.predicate(owns_any,
+                        name='{}.owns_any'.format(model.__name__)),
+    ]
+    for level in range(levels):
+        predicates.append(rules.predicate(
+            has_level(level),
+            name='{}.level_{}'.format(model.__name__, level)))
+    return predicates
+
+
+def has_level(level):
+    def fn(user, target):
+        return target.level >= level
+    return fn
+
+
+def build_tree(rng, leaves, depth):
+    """Combines randomly chosen leaves into a predicate tree of the given
+    depth using ``&``, ``|`` and ``~``.
+    """
+    if depth <= 1:
+        return rng.choice(leaves)
+
+    op = rng.choice(('AND', 'AND', 'OR', 'OR', 'INVERT'))
+    if op == 'INVERT':
+        return ~build_tree(rng, leaves, depth - 1)
+    left = build_tree(rng, leaves, depth - 1)
+    right = build_tree(rng, leaves, rng.randint(1, depth - 1))
+    return left & right if op == 'AND' else left | right
+
+
+def register_permissions(rng, synthetic_models, count, depth):
+    """Registers ``count`` permissions per model, half of them involving an
+    object of the model, and returns a dict mapping each model to its lists
+    of permissions and object permissions.
+    """
+    registry = {}
+    for model in synthetic_models:
+        perms, object_perms = [], []
+        leaves = user_predicates()
+        object_leaves = leaves + object_predicates(model)
+        for index in range(count):
+            if index % 2:
+                name = 'synthetic.{}_object_{}'.format(
+                    model.__name__.lower(), index)
+                predicate = build_tree(rng, object_leaves,
+                                       rng.randint(1, depth))
+                object_perms.append(name)
+            else:
+                name = 'synthetic.{}_{}'.format(model.__name__.lower(), index)
+                predicate = build_tree(rng, leaves, rng.randint(1, depth))
+                perms.append(name)
+            if rules.perm_exists(name):
+                rules.remove_perm(name)
+            rules.add_perm(name, predicate)
+        registry[model] = (perms, object_perms)
+    return registry
+
+
+# Views
+
+def get_serializer_class(model):
+    return type('{}Serializer'.format(model.__name__),
+                (serializers.ModelSerializer, ),
+                {'Meta': type('Meta', (), {'model': model,
+                                           'fields': '__all__'})})
+
+
+def mixin_view(model, perms, object_perms):
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    return type('MixinView', (PermissionRequiredMixin, GenericAPIView), {
+        'get': get,
+        'object_permission_required': tuple(object_perms),
+        'permission_required': tuple(perms),
+        'queryset': model.objects.all(),
+        'serializer_class': get_serializer_class(model),
+    })
+
+
+def decorated_view(perms):
+    @permission_required(*perms)
+    def get(self, request, *args, **kwargs):
+        return Response({'the man': 'you'})
+
+    return type('DecoratedView', (APIView, ), {'get': get})
+
+
+def filtered_list_view(model, perms, object_perms):
+    return type('FilteredListView', (PermissionRequiredMixin, ListAPIView), {
+        'filter_backends': (ObjectPermissionsFilter, ),
+        'object_permission_required': tuple(object_perms),
+        'permission_required': tuple(perms),
+        'queryset': model.objects.all(),
+        'serializer_class': get_serializer_class(model),
+    })
+
+
+def choose_permissions(rng, perms, count, allowed):
+    # prefers the allowed permissions, so that not all requests are denied
+    granted = [perm for perm in perms if allowed(perm)]
+    denied = [perm for perm in perms if perm not in granted]
+    chosen = rng.sample(granted, min(count, len(granted)))
+    return chosen + rng.sample(denied, min(count - len(chosen), len(denied)))
+
+
+def create_urlconf(rng, registry, required, user):
+    """Returns a URLconf routing a view using the mixin, a view decorated
+    using ``permission_required`` and a filtered list view per model, each
+    requiring ``required`` permissions (and object permissions) of the model,
+    preferably ones the given user has (on an object of the model).
+    """
+    urlpatterns = []
+    for model, (perms, object_perms) in registry.items():
+        prefix = model.__name__.lower()
+        obj = model.objects.first()
+        view_perms = choose_permissions(rng, perms, required, user.has_perm)
+        view_object_perms = choose_permissions(
+            rng, object_perms, required,
+            lambda perm: user.has_perm(perm, obj))
+        urlpatterns += [
+            url(r'^{}/mixin/(?P<pk>[0-9]+)/$'.format(prefix),
+                mixin_view(model, view_perms, view_object_perms).as_view()),
+            url(r'^{}/decorator/$'.format(prefix),
+                decorated_view(view_perms).as_view()),
+            url(r'^{}/filtered/$'.format(prefix),
+                filtered_list_view(model, view_perms,
+                                   view_object_perms).as_view()),
+        ]
+    urlconf = types.ModuleType('benchmarks.synthetic_urls')
+    urlconf.urlpatterns = urlpatterns
+    return urlconf
@@ -0,0 +1,124 @@
+from __future__ import absolute_import
+
+import rules
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.generics import GenericAPIView, ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet
+from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.filters import ObjectPermissionsFilter
+from rest_framework_rules.mixins import PermissionRequiredMixin
+from testapp.models import Book
+from testapp.rules import is_author
+from testapp.serializers import BookSerializer
+
+
+# Predicates
+
+@rules.predicate
+def is_active(user):
+    # a cheap attribute check
+    return user.is_active
+
+
+@rules.predicate
+def has_books(user):
+    # a predicate querying the database
+    return Book.objects.filter(author=user).exists()
+
+
+PREDICATES = {
+    'attribute': is_active,
+    'query': has_books,
+}
+
+
+def register_permissions(count, depth, kind):
+    """Registers ``count`` permissions, each one composed of ``depth``
+    predicates of the given kind, and returns their names.
+    """
+    perms = []
+    for index in range(count):
+        predicate = PREDICATES[kind]
+        for _ in range(depth - 1):
+            predicate = predicate & PREDICATES[kind]
+        name = 'benchmarks.{}_{}_{}_{}'.format(kind, count, depth, index)
+        if not rules.perm_exists(name):
+            rules.add_perm(name, predicate)
+        perms.append(name)
+    return tuple(perms)
+
+
+rules.add_perm('benchmarks.author', is_author)
+
+
+# Views
+
+class PlainView(APIView):
+
+    def get(self, request, *args, **kwargs):
+        return Response({'the man': 'you'})
+
+
+class PlainGenericView(GenericAPIView):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+class PlainListView(ListAPIView):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+
+def mixin_view(perms):
+    return type('MixinView', (PermissionRequiredMixin, PlainView),
+                {'permission_required': perms})
+
+
+def mixin_generic_view(perms):
+    return type('MixinGenericView', (PermissionRequiredMixin, PlainGenericView),
+                {'object_permission_required': 'benchmarks.author',
+                 'permission_required': perms})
+
+
+def decorated_view(perms):
+    @permission_required(*perms)
+    def get(self, request, *args, **kwargs):
+        return Response({'the man': 'you'})
+
+    return type('DecoratedView', (APIView, ), {'get': get})
+
+
+def filtered_list_view(perms):
+    return type('FilteredListView', (PermissionRequiredMixin, PlainListView),
+                {'filter_backends': (ObjectPermissionsFilter, ),
+                 'object_permission_required': 'benchmarks.author',
+                 'permission_required': perms})
+
+
+def route_viewset(perms):
+    @list_route(methods=['get'], permission_required=perms)
+    def listed(self, request):
+        return Response({'the man': 'you'})
+
+    @detail_route(methods=['get'], permission_required=perms,
+                  object_permission_required='benchmarks.author')
+    def detailed(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    return type('RouteViewSet', (PermissionRequiredMixin, GenericViewSet),
+                {'listed': listed,
+                 'detailed': detailed,
+                 'permission_required': perms,
+                 'queryset': Book.objects.all(),
+                 'serializer_class': BookSerializer})
+
+
+def route_view(viewset, name):
+    # mirrors how the routers instantiate the custom routes of a viewset
+    action = getattr(viewset, name)
+    return viewset.as_view({'get': name}, **action.kwargs)
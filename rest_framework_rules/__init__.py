@@ -1 +1,3 @@
 VERSION = (1, 0, 0)
+
+default_app_config = 'rest_framework_rules.apps.RestFrameworkRulesConfig'
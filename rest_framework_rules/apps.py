@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class RestFrameworkRulesConfig(AppConfig):
+
+    name = 'rest_framework_rules'
+    verbose_name = 'Django REST framework rules'
+
+    def ready(self):
+        # registers the system checks
+        from . import checks  # noqa
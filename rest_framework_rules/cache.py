@@ -0,0 +1,331 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.crypto import salted_hmac
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class PermissionCache:
+
+    """Memoizes the permission decisions taken while handling a request.
+    """
+
+    def __init__(self):
+        self._decisions = {}
+
+    @staticmethod
+    def get_key(perm, obj=None):
+        if obj is None:
+            return (perm, None)
+
+        # model instances are identified by their primary key, so that the
+        # same row fetched twice shares a single decision
+        pk = getattr(obj, 'pk', None)
+        if pk is not None and hasattr(obj, '_meta'):
+            return (perm, obj._meta.label, pk)
+
+        return (perm, id(obj))
+
+    def get(self, perm, obj=None):
+        try:
+            return self._decisions[self.get_key(perm, obj)][0]
+        except KeyError:
+            return None
+
+    def set(self, perm, obj, decision):
+        # the object is kept alongside the decision, which prevents its id
+        # from being reused by another object during the request
+        self._decisions[self.get_key(perm, obj)] = (decision, obj)
+
+    def has_perm(self, user, perm, obj=None):
+        decision = self.get(perm, obj)
+        if decision is None:
+            decision = user.has_perm(perm, obj)
+            self.set(perm, obj, decision)
+        return decision
+
+    def invalidate(self, obj):
+        # discards the decisions taken on the object
+        key = self.get_key(None, obj)[1:]
+        for decision_key in [decision_key for decision_key in self._decisions
+                             if decision_key[1:] == key]:
+            del self._decisions[decision_key]
+
+    def clear(self):
+        self._decisions.clear()
+
+
+def get_request_cache(request):
+    try:
+        return request._permission_cache
+    except AttributeError:
+        request._permission_cache = PermissionCache()
+        return request._permission_cache
+
+
+class DecisionCache:
+
+    """Base class of the caches storing the decisions on permissions which do
+    not involve an object across requests.
+
+    The decisions are keyed by user and permission. Invalidating the cache
+    discards all decisions, which can be triggered by signals::
+
+        >>> decision_cache = LocMemDecisionCache(max_size=10000, timeout=300)
+        >>> decision_cache.invalidate_on(post_save, sender=RouteSetter)
+        >>> decision_cache.invalidate_on(post_delete, sender=RouteSetter)
+
+    """
+
+    def get(self, user, perm):
+        # returns the decision or None if there is no (valid) decision
+        raise NotImplementedError
+
+    def set(self, user, perm, decision):
+        raise NotImplementedError
+
+    def invalidate(self):
+        raise NotImplementedError
+
+    def invalidate_on(self, signal, sender=None):
+        signal.connect(self.receive_signal, sender=sender, weak=False)
+
+    def receive_signal(self, sender, **kwargs):
+        self.invalidate()
+
+    def has_perm(self, user, perm):
+        decision = self.get(user, perm)
+        if decision is None:
+            decision = user.has_perm(perm)
+            self.set(user, perm, decision)
+        return decision
+
+
+class LocMemDecisionCache(DecisionCache):
+
+    """Stores the decisions in the memory of the process, discarding the least
+    recently used decisions beyond ``max_size`` and the decisions older than
+    ``timeout`` seconds.
+    """
+
+    def __init__(self, max_size=1024, timeout=60):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._decisions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user, perm):
+        key = (user.pk, perm)
+        with self._lock:
+            try:
+                decision, expires = self._decisions[key]
+            except KeyError:
+                return None
+            if expires < time.monotonic():
+                del self._decisions[key]
+                return None
+            self._decisions.move_to_end(key)
+            return decision
+
+    def set(self, user, perm, decision):
+        key = (user.pk, perm)
+        with self._lock:
+            self._decisions[key] = (decision, time.monotonic() + self.timeout)
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.max_size:
+                self._decisions.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._decisions.clear()
+
+
+class DenialCache(LocMemDecisionCache):
+
+    """Stores the denials only, for a few seconds, which allows repeatedly
+    denied requests (e.g. clients retrying in a loop) to be rejected before
+    evaluating any permission.
+    """
+
+    def __init__(self, max_size=1024, timeout=5):
+        super().__init__(max_size=max_size, timeout=timeout)
+
+    def set(self, user, perm, decision):
+        if not decision:
+            super().set(user, perm, decision)
+
+
+class DjangoDecisionCache(DecisionCache):
+
+    """Stores the decisions in one of the caches configured in the Django
+    settings, which allows sharing them among processes.
+
+    The keys contain a version counter stored in the cache, invalidating the
+    cache increments the version.
+    """
+
+    def __init__(self, alias='default', timeout=60,
+                 key_prefix='rest_framework_rules'):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return '{}:version'.format(self.key_prefix)
+
+    def get_version(self):
+        # a missing (e.g. evicted) version restarts from the current time,
+        # which prevents reviving the decisions stored with older versions
+        return self.cache.get_or_set(self.version_key,
+                                     int(time.time() * 1000), None)
+
+    def get_key(self, user, perm):
+        return '{}:{}:{}:{}'.format(self.key_prefix, self.get_version(),
+                                    user.pk, perm)
+
+    def get(self, user, perm):
+        return self.cache.get(self.get_key(user, perm))
+
+    def set(self, user, perm, decision):
+        self.cache.set(self.get_key(user, perm), decision, self.timeout)
+
+    def invalidate(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            self.get_version()
+
+
+class MmapDecisionCache(DecisionCache):
+
+    """Stores the decisions in a memory-mapped file, which is shared by the
+    processes of a host (e.g. the workers of an application server) without
+    requiring a cache server.
+
+    The file holds a header with the cache's version followed by ``slots``
+    fixed-size slots, a decision being stored in the slot selected by the
+    hash of its user and permission (replacing the previous decision of
+    the slot). Invalidating the cache increments the version, which discards
+    the decisions stored with older versions. The processes sharing a file
+    must use the same number of slots. Requires ``fcntl`` (i.e. Unix).
+
+    The file must belong to the effective user of the process and must not
+    be accessible to others (nor be a symbolic link), and the slots are keyed
+    with an HMAC of the ``secret`` (by default, the ``SECRET_KEY``), so that
+    other users of the host can neither read nor forge decisions.
+    """
+
+    header = struct.Struct('<4sQ')
+    magic = b'RFR1'
+    slot = struct.Struct('<16sQdB')
+
+    def __init__(self, path, slots=65536, timeout=60, secret=None):
+        if fcntl is None:
+            raise ImproperlyConfigured(
+                'MmapDecisionCache requires the fcntl module.')
+        self.path = path
+        self.secret = secret
+        self.slots = slots
+        self.timeout = timeout
+        self.size = self.header.size + self.slot.size * slots
+        self._file = None
+        self._mmap = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, exclusive=False):
+        # flock does not exclude the threads sharing the file descriptor
+        with self._lock:
+            # forked processes open their own file description, which their
+            # locks require
+            if self._pid != os.getpid():
+                self.open()
+            fcntl.flock(self._file.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield self._mmap
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def open(self):
+        try:
+            fd = os.open(self.path,
+                         os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        except OSError as e:
+            raise ImproperlyConfigured(
+                'Cannot open the decision cache {}: {}'.format(self.path, e))
+        stat = os.fstat(fd)
+        if stat.st_uid != os.geteuid() or stat.st_mode & 0o077:
+            os.close(fd)
+            raise ImproperlyConfigured(
+                'The decision cache {} must belong to the user of the process '
+                'and must not be accessible to others.'.format(self.path))
+        self._file = os.fdopen(fd, 'r+b')
+        self._pid = os.getpid()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, self.size)
+            self._mmap = mmap.mmap(fd, self.size)
+            magic, version = self.header.unpack_from(self._mmap, 0)
+            if magic != self.magic:
+                # the slots of a new file are zeroed, i.e. have version 0
+                self.header.pack_into(self._mmap, 0, self.magic, 1)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._file.close()
+                self._mmap = self._file = self._pid = None
+
+    def get_digest(self, user, perm):
+        return salted_hmac('rest_framework_rules.MmapDecisionCache',
+                           '{}:{}'.format(user.pk, perm),
+                           secret=self.secret).digest()[:16]
+
+    def get_offset(self, digest):
+        index = int.from_bytes(digest[:8], 'little') % self.slots
+        return self.header.size + self.slot.size * index
+
+    def get(self, user, perm):
+        digest = self.get_digest(user, perm)
+        with self.locked() as data:
+            version = self.header.unpack_from(data, 0)[1]
+            key, slot_version, expires, decision = self.slot.unpack_from(
+                data, self.get_offset(digest))
+        if key != digest or slot_version != version or expires < time.time():
+            return None
+        return bool(decision)
+
+    def set(self, user, perm, decision):
+        digest = self.get_digest(user, perm)
+        with self.locked(exclusive=True) as data:
+            version = self.header.unpack_from(data, 0)[1]
+            self.slot.pack_into(data, self.get_offset(digest), digest,
+                                version, time.time() + self.timeout,
+                                int(bool(decision)))
+
+    def invalidate(self):
+        with self.locked(exclusive=True) as data:
+            version = self.header.unpack_from(data, 0)[1]
+            self.header.pack_into(data, 0, self.magic, version + 1)
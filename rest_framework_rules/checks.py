@@ -0,0 +1,128 @@
+from django.apps import apps
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.urls import get_resolver
+from rules.permissions import permissions
+
+from .mixins import PermissionRequiredMixin
+from .permissions import PermissionMap
+
+
+def get_model_permissions():
+    # the permissions created by django.contrib.auth for the installed models
+    perms = set()
+    for model in apps.get_models():
+        opts = model._meta
+        for action in opts.default_permissions:
+            perms.add('{}.{}_{}'.format(opts.app_label, action,
+                                        opts.model_name))
+        for codename, name in opts.permissions:
+            perms.add('{}.{}'.format(opts.app_label, codename))
+    return perms
+
+
+def get_views(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from get_views(pattern.url_patterns)
+        else:
+            yield pattern.callback
+
+
+def get_permission_names(perms):
+    if isinstance(perms, PermissionMap):
+        return [perm for value in perms.values()
+                for perm in get_permission_names(value)]
+    if isinstance(perms, tuple):
+        return list(perms)
+    return []
+
+
+def get_view_permissions(cls, initkwargs):
+    # the permissions required by the view, including the ones of the
+    # methods decorated using permission_required
+    perms = []
+    for attribute in ('permission_required', 'object_permission_required'):
+        perms.extend(get_permission_names(
+            initkwargs.get(attribute, getattr(cls, attribute))))
+    for name in dir(cls):
+        perms.extend(get_permission_names(
+            getattr(getattr(cls, name, None), 'permission_required', None)))
+    return perms
+
+
+@checks.register('rest_framework_rules')
+def check_permissions(app_configs=None, **kwargs):
+    """Checks the views of the URLconf which require permissions: views
+    without permission_required are errors, permissions which are neither
+    registered with rules nor model permissions are warnings.
+    """
+    errors = []
+    known = None
+    # a class is routed once per action of a viewset
+    seen = set()
+    for view in get_views(get_resolver().url_patterns):
+        cls = getattr(view, 'cls', None)
+        initkwargs = getattr(view, 'initkwargs', {})
+        if cls is None or not issubclass(cls, PermissionRequiredMixin):
+            continue
+
+        if (initkwargs.get('permission_required',
+                           cls.permission_required) is None and
+                cls.get_permission_required is
+                PermissionRequiredMixin.get_permission_required and
+                (cls, None) not in seen):
+            seen.add((cls, None))
+            errors.append(checks.Error(
+                '{} is missing the permission_required attribute.'
+                .format(cls.__name__),
+                obj=cls,
+                id='rest_framework_rules.E001',
+            ))
+
+        for perm in get_view_permissions(cls, initkwargs):
+            if perm in permissions or (cls, perm) in seen:
+                continue
+            if known is None:
+                known = get_model_permissions()
+            if perm not in known:
+                seen.add((cls, perm))
+                errors.append(checks.Warning(
+                    '{} requires the unknown permission {!r}.'
+                    .format(cls.__name__, perm),
+                    hint='Register the permission with rules or check '
+                         'its spelling.',
+                    obj=cls,
+                    id='rest_framework_rules.W001',
+                ))
+    return errors
+
+
+@checks.register('rest_framework_rules')
+def check_snapshot_cache(app_configs=None, **kwargs):
+    """Checks that the version of the permission snapshots is shared among
+    the processes if a view of the URLconf uses the snapshots.
+    """
+    from .snapshots import get_max_age
+
+    # the snapshots use django.core.cache.cache, a proxy of the default cache
+    if not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return []
+    for view in get_views(get_resolver().url_patterns):
+        cls = getattr(view, 'cls', None)
+        if (cls is not None and issubclass(cls, PermissionRequiredMixin) and
+                getattr(view, 'initkwargs', {}).get(
+                    'permission_snapshot', cls.permission_snapshot)):
+            return [checks.Warning(
+                '{} answers permissions from snapshots, whose version is '
+                'stored in a process-local cache.'.format(cls.__name__),
+                hint='Invalidating the snapshots only affects the current '
+                     'process, the other processes keep answering from them '
+                     'for up to {} seconds (see '
+                     'REST_FRAMEWORK_RULES_SNAPSHOT_MAX_AGE). Configure a '
+                     'shared default cache.'.format(get_max_age()),
+                obj=cls,
+                id='rest_framework_rules.W002',
+            )]
+    return []
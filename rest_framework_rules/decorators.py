@@ -1,7 +1,28 @@
+import asyncio
+
 from django.core.exceptions import ImproperlyConfigured
 
+from .evaluation import PermissionChecker
+from .permissions import normalize_permissions
+
+
+def permission_required(*permissions, fn=None, pass_object=False,
+                        cache=False, decision_cache=None, report_all=False,
+                        metrics_callback=None, denial_cache=None,
+                        trace=False, executor=None, timeout=None):
 
-def permission_required(*permissions, fn=None):
+    # fails when the view is defined instead of when it is requested
+    permissions = normalize_permissions(permissions)
+
+    def get_checker(view, request):
+        return PermissionChecker(request, cache=cache,
+                                 decision_cache=decision_cache,
+                                 denial_cache=denial_cache,
+                                 report_all=report_all,
+                                 sender=type(view),
+                                 metrics_callback=metrics_callback,
+                                 trace=trace, executor=executor,
+                                 timeout=timeout)
 
     def decorator(view):
         def wrapped_view(self, request, *args, **kwargs):
@@ -11,8 +32,8 @@ def permission_required(*permissions, fn=None):
             else:
                 obj = fn
 
-            missing_permissions = [perm for perm in permissions
-                                   if not request.user.has_perm(perm, obj)]
+            missing_permissions = (get_checker(self, request)
+                                   .get_missing_permissions(permissions, obj))
             if any(missing_permissions):
                 # raises a permission denied exception causing a 403 response
                 self.permission_denied(
@@ -21,6 +42,43 @@ def permission_required(*permissions, fn=None):
                              .format(', '.join(missing_permissions)))
                 )
 
+            if pass_object:
+                # the view (and its get_object, if the view is mixed with
+                # the PermissionRequiredMixin) reuses the resolved object
+                self.permission_object = obj
+
             return view(self, request, *args, **kwargs)
+
+        async def async_wrapped_view(self, request, *args, **kwargs):
+
+            if asyncio.iscoroutinefunction(fn):
+                obj = await fn(request, *args, **kwargs)
+            elif callable(fn):
+                from asgiref.sync import sync_to_async
+                obj = await sync_to_async(fn)(request, *args, **kwargs)
+            else:
+                obj = fn
+
+            missing_permissions = await (get_checker(self, request)
+                                         .aget_missing_permissions(
+                                             permissions, obj))
+            if any(missing_permissions):
+                self.permission_denied(
+                    request,
+                    message=('Missing: {}'
+                             .format(', '.join(missing_permissions)))
+                )
+
+            if pass_object:
+                self.permission_object = obj
+
+            return await view(self, request, *args, **kwargs)
+
+        if asyncio.iscoroutinefunction(view):
+            wrapped_view = async_wrapped_view
+        # exposes the permissions (and whether they are checked on an
+        # object), e.g. to the system checks
+        wrapped_view.permission_required = permissions
+        wrapped_view.permission_fn = fn
         return wrapped_view
     return decorator
@@ -0,0 +1,342 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import ExitStack, contextmanager
+from time import monotonic, perf_counter
+
+from django.db import close_old_connections, connections
+from rules.permissions import permissions
+
+from .cache import get_request_cache
+from .predicates import (ahas_perm, get_constant_decision,
+                         get_declared_cost, has_perms_many)
+from .signals import permission_checked
+
+
+# weight of the latest measurement in the moving average of the costs
+SMOOTHING = 0.2
+
+logger = logging.getLogger('rest_framework_rules.evaluation')
+
+_measured_costs = {}
+
+
+def get_cost(perm):
+    """Returns the expected evaluation time of the permission in milliseconds.
+
+    The cost declared by the permission's predicates takes precedence over the
+    measured one. Permissions which were never measured are considered free,
+    so that they get measured first.
+    """
+    if perm in permissions:
+        declared = get_declared_cost(permissions[perm])
+        if declared is not None:
+            return declared
+    return _measured_costs.get(perm, 0)
+
+
+def record_cost(perm, duration):
+    measured = _measured_costs.get(perm)
+    if measured is None:
+        _measured_costs[perm] = duration
+    else:
+        _measured_costs[perm] = measured + SMOOTHING * (duration - measured)
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Counts the queries executed on all database connections within the
+    block. The count is ``None`` if a connection does not support wrapping
+    the execution of its queries (Django < 2.0).
+    """
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            if hasattr(connection, 'execute_wrapper'):
+                stack.enter_context(connection.execute_wrapper(counter))
+            else:
+                counter.count = None
+        yield counter
+
+
+def get_missing_permissions(has_perm, perms, obj=None, report_all=False):
+    """Returns the permissions the user is missing, as decided by
+    ``has_perm(perm, obj)``.
+
+    The permissions are evaluated from the cheapest to the most expensive one
+    and the evaluation stops at the first missing permission, unless
+    ``report_all`` is set. The missing permissions are returned in the order
+    they were given.
+    """
+    missing = set()
+    for perm in sorted(perms, key=get_cost):
+        if not has_perm(perm, obj):
+            missing.add(perm)
+            if not report_all:
+                break
+    return [perm for perm in perms if perm in missing]
+
+
+async def aget_missing_permissions(ahas_perm, perms, obj=None,
+                                   report_all=False):
+    """Asynchronous version of ``get_missing_permissions``, awaiting
+    ``ahas_perm(perm, obj)``.
+
+    The permissions are evaluated concurrently. Unless ``report_all`` is set,
+    the pending evaluations are cancelled at the first missing permission.
+    """
+    tasks = {asyncio.ensure_future(ahas_perm(perm, obj)): perm
+             for perm in set(perms)}
+    missing = set()
+    pending = set(tasks)
+    try:
+        while pending and (report_all or not missing):
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            missing.update(tasks[task] for task in done if not task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+    return [perm for perm in perms if perm in missing]
+
+
+def evaluate_in_thread(has_perm, perm, obj=None):
+    # the connections opened by the thread are closed like at the end of a
+    # request (depending on CONN_MAX_AGE), since no request ends there
+    try:
+        return has_perm(perm, obj)
+    finally:
+        close_old_connections()
+
+
+def in_atomic_block():
+    # the threads' connections do not see the writes of the caller's
+    # transaction (e.g. ATOMIC_REQUESTS), nor in-memory test databases
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def is_decided(perms, decisions):
+    # whether the first missing permission (in the given order) is known
+    for perm in perms:
+        decision = decisions.get(perm)
+        if decision is None:
+            return False
+        if not decision:
+            return True
+    return True
+
+
+def get_missing_permissions_threaded(has_perm, perms, executor, obj=None,
+                                     report_all=False, timeout=None):
+    """Threaded version of ``get_missing_permissions``, evaluating the
+    permissions concurrently on the ``executor`` (e.g. a bounded
+    ``ThreadPoolExecutor``).
+
+    Unless ``report_all`` is set, the evaluation stops once the first missing
+    permission in the given order is known, which is the one returned
+    whatever order the evaluations complete in, and the pending evaluations
+    are cancelled. The permissions whose evaluation does not complete within
+    ``timeout`` seconds are missing.
+    """
+    unique = list(OrderedDict.fromkeys(perms))
+    futures = OrderedDict(
+        (executor.submit(evaluate_in_thread, has_perm, perm, obj), perm)
+        for perm in unique)
+    deadline = None if timeout is None else monotonic() + timeout
+    decisions = {}
+    pending = set(futures)
+    try:
+        while pending and (report_all or not is_decided(unique, decisions)):
+            remaining = (None if deadline is None
+                         else max(deadline - monotonic(), 0))
+            done, pending = wait(pending, timeout=remaining,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                decisions[futures[future]] = bool(future.result())
+    finally:
+        for future in pending:
+            future.cancel()
+
+    timed_out = [perm for perm in unique if perm not in decisions]
+    if timed_out and (report_all or not is_decided(unique, decisions)):
+        logger.warning('The evaluation of %s timed out after %s seconds.',
+                       ', '.join(timed_out), timeout)
+
+    missing = [perm for perm in perms if not decisions.get(perm, False)]
+    if report_all:
+        return missing
+    return missing[:1]
+
+
+class PermissionChecker:
+
+    """Checks the permissions of the request's user. The decisions known
+    from the class of the user (see ``get_constant_decision``) are answered
+    directly, otherwise the request cache (if ``cache`` is set), the user's
+    ``snapshot``, the ``denial_cache`` and the ``decision_cache`` (the latter
+    three for permissions not involving an object) are consulted before
+    evaluating the permissions.
+
+    The metrics of each evaluation are sent with the ``permission_checked``
+    signal, passed to the ``metrics_callback`` and, if ``record_metrics`` is
+    set, appended to the request's ``_permission_metrics``. If ``trace`` is
+    set, the evaluations of the predicates are traced (see ``tracing``).
+
+    Given an ``executor``, the required permissions are evaluated in its
+    threads (see ``get_missing_permissions_threaded``), except within a
+    transaction, whose writes the threads' connections would not see.
+    """
+
+    def __init__(self, request, cache=False, decision_cache=None,
+                 report_all=False, sender=None, metrics_callback=None,
+                 record_metrics=False, denial_cache=None, snapshot=None,
+                 trace=False, executor=None, timeout=None):
+        self.request = request
+        self.user = request.user
+        self.cache = get_request_cache(request) if cache else None
+        self.decision_cache = decision_cache
+        self.denial_cache = denial_cache
+        self.snapshot = snapshot
+        self.report_all = report_all
+        self.sender = sender
+        self.metrics_callback = metrics_callback
+        self.record_metrics = record_metrics
+        self.trace = trace
+        self.executor = executor
+        self.timeout = timeout
+
+    @property
+    def is_instrumented(self):
+        return (self.metrics_callback is not None or self.record_metrics or
+                permission_checked.has_listeners(self.sender))
+
+    def report(self, **metrics):
+        permission_checked.send(sender=self.sender, request=self.request,
+                                user=self.user, **metrics)
+        if self.metrics_callback is not None:
+            self.metrics_callback(request=self.request, user=self.user,
+                                  **metrics)
+        if self.record_metrics:
+            try:
+                self.request._permission_metrics.append(metrics)
+            except AttributeError:
+                self.request._permission_metrics = [metrics]
+
+    def has_perm_traced(self, perm, obj=None):
+        from .tracing import record_trace, trace_permission
+
+        permission_trace = trace_permission(self.user, perm, obj)
+        record_trace(self.request, permission_trace)
+        return permission_trace.allowed
+
+    def evaluate(self, perm, obj=None):
+        # the costs are only measured here, the cached decisions would drag
+        # their moving average towards zero
+        has_perm = self.has_perm_traced if self.trace else self.user.has_perm
+        if not self.is_instrumented:
+            start = perf_counter()
+            allowed = has_perm(perm, obj)
+            record_cost(perm, (perf_counter() - start) * 1000)
+            return allowed
+
+        with count_queries() as queries:
+            start = perf_counter()
+            allowed = has_perm(perm, obj)
+            duration = (perf_counter() - start) * 1000
+        record_cost(perm, duration)
+        self.report(permission=perm, obj=obj, allowed=allowed,
+                    duration=duration, queries=queries.count)
+        return allowed
+
+    async def aevaluate(self, perm, obj=None):
+        if not self.is_instrumented:
+            return await ahas_perm(self.user, perm, obj)
+
+        # the queries are executed in other threads, whose connections
+        # cannot be observed from here
+        start = perf_counter()
+        allowed = await ahas_perm(self.user, perm, obj)
+        duration = (perf_counter() - start) * 1000
+        self.report(permission=perm, obj=obj, allowed=allowed,
+                    duration=duration, queries=None)
+        return allowed
+
+    def get_cached(self, perm, obj=None):
+        decision = get_constant_decision(self.user, perm)
+        if decision is None and self.cache is not None:
+            decision = self.cache.get(perm, obj)
+        if decision is None and obj is None and self.snapshot is not None:
+            decision = self.snapshot.get(perm)
+        if decision is None and obj is None and self.denial_cache is not None:
+            decision = self.denial_cache.get(self.user, perm)
+        if decision is None and obj is None and self.decision_cache is not None:
+            decision = self.decision_cache.get(self.user, perm)
+            if decision is not None and self.cache is not None:
+                self.cache.set(perm, obj, decision)
+        return decision
+
+    def set_cached(self, perm, obj, decision):
+        if self.cache is not None:
+            self.cache.set(perm, obj, decision)
+        if obj is None and self.denial_cache is not None:
+            self.denial_cache.set(self.user, perm, decision)
+        if obj is None and self.decision_cache is not None:
+            self.decision_cache.set(self.user, perm, decision)
+
+    def has_perm(self, perm, obj=None):
+        decision = self.get_cached(perm, obj)
+        if decision is None:
+            decision = self.evaluate(perm, obj)
+            self.set_cached(perm, obj, decision)
+        return decision
+
+    async def ahas_perm(self, perm, obj=None):
+        decision = self.get_cached(perm, obj)
+        if decision is None:
+            decision = await self.aevaluate(perm, obj)
+            self.set_cached(perm, obj, decision)
+        return decision
+
+    def get_cached_denials(self, perms, obj=None):
+        # the recently denied permissions, which reject the request before
+        # evaluating any permission
+        if self.denial_cache is None or obj is not None or self.report_all:
+            return []
+        return [perm for perm in perms
+                if self.denial_cache.get(self.user, perm) is False]
+
+    def get_missing_permissions(self, perms, obj=None):
+        cached_denials = self.get_cached_denials(perms, obj)[:1]
+        if cached_denials:
+            return cached_denials
+        # a single permission is only evaluated in a thread to time it out
+        if (self.executor is not None and
+                (len(perms) > 1 or self.timeout is not None) and
+                not in_atomic_block()):
+            return get_missing_permissions_threaded(
+                self.has_perm, perms, self.executor, obj,
+                report_all=self.report_all, timeout=self.timeout)
+        return get_missing_permissions(self.has_perm, perms, obj,
+                                       report_all=self.report_all)
+
+    async def aget_missing_permissions(self, perms, obj=None):
+        return (self.get_cached_denials(perms, obj)[:1] or
+                await aget_missing_permissions(self.ahas_perm, perms, obj,
+                                               report_all=self.report_all))
+
+    def has_perms_many(self, perms, objects, stop_on_denial=False):
+        return has_perms_many(self.user, perms, objects,
+                              stop_on_denial=stop_on_denial, cache=self.cache)
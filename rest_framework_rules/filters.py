@@ -0,0 +1,104 @@
+import logging
+
+from django.db import connections
+from rest_framework.filters import BaseFilterBackend
+from rules.permissions import permissions
+
+from .predicates import filter_objects, get_related_lookups, permissions_to_q
+
+
+logger = logging.getLogger('rest_framework_rules.filters')
+
+_uncompiled = set()
+
+
+def select_permission_related(perms, queryset):
+    """Applies the ``select_related`` fields and ``prefetch_related`` lookups
+    declared by the predicates of the permissions to the queryset.
+    """
+    fields, lookups = set(), set()
+    for perm in perms:
+        if perm in permissions:
+            perm_fields, perm_lookups = get_related_lookups(permissions[perm])
+            fields |= perm_fields
+            lookups |= perm_lookups
+
+    if fields:
+        queryset = queryset.select_related(*sorted(fields))
+    if lookups:
+        queryset = queryset.prefetch_related(*sorted(lookups))
+    return queryset
+
+
+def get_max_query_params(alias):
+    connection = connections[alias]
+    if hasattr(connection.features, 'max_query_params'):
+        return connection.features.max_query_params
+    # django < 2.2
+    return 999 if connection.vendor == 'sqlite' else None
+
+
+def get_permitted_queryset(user, perms, queryset):
+    """Restricts the queryset to the objects on which the user has all the
+    permissions.
+
+    The permissions are compiled into a filter applied by the database where
+    possible, otherwise they are evaluated on the objects of the queryset,
+    which should then be narrowed down beforehand (a warning is logged once).
+    The evaluated objects are then filtered by their primary keys, or returned
+    as a list if there are more keys than the query parameters the database
+    supports.
+    """
+    q = permissions_to_q(user, perms)
+    if q is True:
+        return queryset
+    if q is False:
+        return queryset.none()
+    if q is not None:
+        return queryset.filter(q)
+
+    key = (tuple(perms), getattr(user, 'is_authenticated', False))
+    if key not in _uncompiled:
+        _uncompiled.add(key)
+        logger.warning(
+            'The permissions %s cannot be compiled into a queryset filter for '
+            '%s users, they are evaluated on each object of the queryset. '
+            'Register a queryset_filter (or declare the results for anonymous '
+            'users using constant) for their predicates taking a target.',
+            ', '.join(perms),
+            'authenticated' if key[1] else 'unauthenticated')
+
+    objects = list(select_permission_related(perms, queryset))
+    permitted = filter_objects(user, perms, objects)
+    permitted_pks = {obj.pk for obj in permitted}
+    denied_pks = {obj.pk for obj in objects} - permitted_pks
+    max_query_params = get_max_query_params(queryset.db)
+    if (max_query_params is None or
+            min(len(permitted_pks), len(denied_pks)) <= max_query_params):
+        if len(denied_pks) < len(permitted_pks):
+            return queryset.exclude(pk__in=denied_pks)
+        return queryset.filter(pk__in=permitted_pks)
+    return permitted
+
+
+class ObjectPermissionsFilter(BaseFilterBackend):
+
+    """Restricts the queryset to the objects on which the request's user has
+    the view's object permissions.
+
+    The queryset of detail requests (whose URL contains the view's lookup) is
+    narrowed down to the requested object instead, whose object permissions
+    are checked by ``get_object``, which denies the request rather than
+    reporting the object as not found.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        lookup_field = getattr(view, 'lookup_field', None)
+        lookup_url_kwarg = (getattr(view, 'lookup_url_kwarg', None) or
+                            lookup_field)
+        kwargs = getattr(view, 'kwargs', None) or {}
+        if lookup_url_kwarg is not None and lookup_url_kwarg in kwargs:
+            return queryset.filter(**{lookup_field: kwargs[lookup_url_kwarg]})
+        return get_permitted_queryset(request.user,
+                                      view.get_object_permission_required(),
+                                      queryset)
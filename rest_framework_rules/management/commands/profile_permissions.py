@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import get_resolver
+
+from rest_framework_rules.profiling import (EndpointProfile,
+                                            get_permission_plan, get_routes)
+
+
+class Command(BaseCommand):
+
+    help = ('Profiles the permissions checked by the routed views for a set '
+            'of sample users.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='users', default=[],
+            help='username of a sample user, may be repeated (default: the '
+                 'anonymous user and the first three active users)')
+        parser.add_argument(
+            '--fixture', action='append', dest='fixtures', default=[],
+            help='fixture loaded before profiling, may be repeated (all '
+                 'changes are rolled back)')
+        parser.add_argument(
+            '--objects', type=int, default=5,
+            help='number of objects of detail routes on which the object '
+                 'permissions are checked, taken from the view\'s queryset '
+                 '(default: 5)')
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='number of the most expensive predicates to report '
+                 '(default: 10)')
+        parser.add_argument('--urlconf', help='defaults to ROOT_URLCONF')
+
+    def get_users(self, usernames):
+        model = get_user_model()
+        manager = model._default_manager
+        if not usernames:
+            return [AnonymousUser()] + list(
+                manager.filter(is_active=True).order_by('pk')[:3])
+
+        users = []
+        for username in usernames:
+            try:
+                users.append(manager.get_by_natural_key(username))
+            except model.DoesNotExist:
+                raise CommandError('Unknown user {!r}.'.format(username))
+        return users
+
+    def get_objects(self, endpoint, count):
+        view_class = endpoint.view_class
+        queryset = getattr(view_class, 'queryset', None)
+        if queryset is None or not count:
+            return []
+        objects = list(queryset.all()[:count])
+        if endpoint.object_fn is None:
+            return objects
+
+        # the objects resolved by the decorator from the URL keyword argument
+        # of the sample objects, like when requesting them
+        lookup_field = getattr(view_class, 'lookup_field', 'pk')
+        lookup_url_kwarg = (getattr(view_class, 'lookup_url_kwarg', None) or
+                            lookup_field)
+        resolved = []
+        for obj in objects:
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            try:
+                resolved.append(endpoint.object_fn(
+                    request,
+                    **{lookup_url_kwarg: getattr(obj, lookup_field)}))
+            except (ObjectDoesNotExist, Http404):
+                pass
+        return resolved
+
+    def handle(self, *args, **options):
+        # the fixtures are loaded in a transaction which is rolled back, along
+        # with anything the predicates may write
+        with transaction.atomic():
+            try:
+                if options['fixtures']:
+                    call_command('loaddata', *options['fixtures'], verbosity=0)
+                self.profile(**options)
+            finally:
+                transaction.set_rollback(True)
+
+    def profile(self, users, objects, iterations, top, urlconf=None,
+                **options):
+        users = self.get_users(users)
+        endpoints = [endpoint
+                     for route, view in get_routes(
+                         get_resolver(urlconf).url_patterns)
+                     for endpoint in get_permission_plan(route, view)]
+
+        predicates = {}
+        for endpoint in endpoints:
+            profile = EndpointProfile(endpoint).run(
+                users, self.get_objects(endpoint, objects), iterations)
+            for name, (total, calls) in profile.predicates.items():
+                predicate_total, predicate_calls = predicates.get(name, (0, 0))
+                predicates[name] = (predicate_total + total,
+                                    predicate_calls + calls)
+            line = '{:<60} {:<6} {:<30}'.format(
+                endpoint.route, endpoint.method, endpoint.action or '')
+            if profile.durations:
+                line += ' {:>9.3f}ms {:>9.3f}ms {:>4} queries'.format(
+                    profile.median, profile.p95, profile.queries)
+            else:
+                line += ' not profiled'
+            if profile.unprofiled:
+                # rather than reporting the checks as free
+                line += ' (no objects to check {} on)'.format(
+                    ', '.join(profile.unprofiled))
+            self.stdout.write(line)
+
+        self.stdout.write('')
+        self.stdout.write('Most expensive predicates:')
+        ranking = sorted(predicates.items(), key=lambda item: -item[1][0])
+        for name, (total, calls) in ranking[:top]:
+            self.stdout.write('{:<60} {:>9.3f}ms {:>6} calls {:>9.3f}ms'
+                              .format(name, total, calls, total / calls))
@@ -1,58 +1,298 @@
+from collections import OrderedDict
+
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
+from .cache import get_request_cache
+from .evaluation import PermissionChecker, get_cost
+from .filters import get_permitted_queryset, select_permission_related
+from .permissions import (PermissionMap, get_permission_table,
+                          normalize_permissions)
+from .snapshots import get_session_snapshot
+
 
 class PermissionRequiredMixin:
 
+    # memoize the object fetched by get_object (after checking its
+    # permissions) for the rest of the request, see invalidate_object
+    cache_object = False
+    # memoize the decisions for the duration of the request, which are then
+    # shared among check_permissions and check_object_permissions
+    cache_permissions = False
+    # a DecisionCache storing the decisions on the permissions not involving
+    # an object across requests
+    decision_cache = None
+    # a DenialCache rejecting the requests of users recently denied one of
+    # the permissions not involving an object
+    denial_cache = None
     object_permission_required = None
+    # a function called with the metrics (permission, obj, allowed, duration,
+    # queries, ...) of each evaluated permission as keyword arguments
+    permission_metrics_callback = None
+    # add the metrics of the evaluated permissions to the response's
+    # X-Permission-Timing header (if DEBUG is enabled)
+    permission_timing_header = False
+    # an executor (e.g. a bounded ThreadPoolExecutor shared by the views) in
+    # whose threads the required permissions are evaluated concurrently
+    permission_executor = None
+    # the object resolved by the permission_required decorator (pass_object)
+    permission_object = None
+    # fetch the relations declared by the predicates of the object
+    # permissions along with the object of detail requests
+    permission_related = True
     permission_required = None
+    # the seconds after which a permission evaluated by the
+    # permission_executor is considered missing
+    permission_timeout = None
+    # answer the permissions not involving an object from the snapshot taken
+    # at login (see get_permission_snapshot)
+    permission_snapshot = False
+    # evaluate all permissions to list every missing one in the error message,
+    # instead of stopping at the first missing one
+    report_all_missing_permissions = False
+    # restrict the queryset of generic views to the objects on which the user
+    # has the object permissions
+    scope_queryset = False
+    # record the evaluated predicate trees of the permissions in the request
+    # (see tracing.get_traces) and log them at debug level
+    trace_permissions = False
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        # the permissions are normalized (and validated) once, when the
+        # URLconf is loaded, instead of on each request
+        for attribute in ('object_permission_required',
+                          'permission_required'):
+            name = '{}.{}'.format(cls.__name__, attribute)
+            setattr(cls, attribute,
+                    normalize_permissions(getattr(cls, attribute), name))
+            if attribute in initkwargs:
+                initkwargs[attribute] = normalize_permissions(
+                    initkwargs[attribute], name)
+        get_permission_table(cls)
+        return super().as_view(*args, **initkwargs)
+
+    def resolve_permissions(self, perms):
+        # selects the permissions of the action or method from a mapping
+        if isinstance(perms, PermissionMap):
+            return perms.resolve(getattr(self, 'action', None),
+                                 self.request.method)
+        return perms
 
     def get_permission_required(self):
 
-        if self.permission_required is None:
+        perms = self.resolve_permissions(self.permission_required)
+        if perms is None:
             # This prevents a misconfiguration of the view into which the mixin
             # is mixed. If the mixin is used, at least one permission should be
             # required.
             raise ImproperlyConfigured(
-                '{0} is missing the permission_required attribute. Define '
-                '{0}.permission_required, or override '
-                '{0}.get_permission_required().'
+                '{0} is missing the permission_required attribute (or its '
+                'entry for the action). Define {0}.permission_required, or '
+                'override {0}.get_permission_required().'
                 .format(self.__class__.__name__)
             )
 
-        if isinstance(self.permission_required, str):
-            perms = (self.permission_required, )
-        else:
-            perms = self.permission_required
-
-        return perms
+        if isinstance(perms, tuple):
+            # normalized by as_view
+            return perms
+        return normalize_permissions(perms)
 
     def get_object_permission_required(self):
 
-        if self.object_permission_required is None:
+        perms = self.resolve_permissions(self.object_permission_required)
+        if perms is None:
             return self.get_permission_required()
 
-        if isinstance(self.object_permission_required, str):
-            perms = (self.object_permission_required, )
+        if isinstance(perms, tuple):
+            return perms
+        return normalize_permissions(perms, 'object_permission_required')
+
+    def get_object(self):
+        if self.cache_object:
+            try:
+                return self._cached_object
+            except AttributeError:
+                pass
+
+        if self.permission_object is None:
+            obj = super().get_object()
         else:
-            perms = self.object_permission_required
+            obj = self.permission_object
+            self.check_object_permissions(self.request, obj)
 
-        return perms
+        if self.cache_object:
+            self._cached_object = obj
+        return obj
+
+    def invalidate_object(self):
+        # discards the memoized object and the decisions taken on it, which
+        # is needed after modifying the object
+        obj = self.__dict__.pop('_cached_object', None)
+        if obj is not None and self.cache_permissions:
+            get_request_cache(self.request).invalidate(obj)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if self.scope_queryset:
+            if lookup_url_kwarg in self.kwargs:
+                # detail requests only scope the requested object, which
+                # matters if the permissions are evaluated in Python
+                queryset = queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            queryset = get_permitted_queryset(
+                self.request.user,
+                self.get_object_permission_required(),
+                queryset)
+        if self.permission_related and lookup_url_kwarg in self.kwargs:
+            queryset = select_permission_related(
+                self.get_object_permission_required(), queryset)
+        return queryset
+
+    def get_permission_snapshot(self, request):
+        # the snapshot stored in the session by snapshots.store_snapshot,
+        # override to read it from elsewhere (e.g. a token)
+        if not self.permission_snapshot:
+            return None
+        return get_session_snapshot(request)
+
+    def get_permission_checker(self, request):
+        return PermissionChecker(
+            request,
+            cache=self.cache_permissions,
+            decision_cache=self.decision_cache,
+            denial_cache=self.denial_cache,
+            snapshot=self.get_permission_snapshot(request),
+            report_all=self.report_all_missing_permissions,
+            sender=type(self),
+            # looked up on the class, which prevents binding the function
+            metrics_callback=type(self).permission_metrics_callback,
+            record_metrics=self.permission_timing_header and settings.DEBUG,
+            trace=self.trace_permissions,
+            executor=self.permission_executor,
+            timeout=self.permission_timeout)
+
+    def has_perm(self, request, perm, obj=None):
+        return self.get_permission_checker(request).has_perm(perm, obj)
+
+    def get_permission_matrix(self, request, objects, perms=None):
+        # evaluates the (object) permissions on all objects at once, which
+        # allows predicates to use their batch implementation
+        if perms is None:
+            perms = self.get_object_permission_required()
+        return (self.get_permission_checker(request)
+                .has_perms_many(perms, objects))
+
+    def get_permitted_objects(self, request, objects):
+        return (self.get_permission_checker(request)
+                .has_perms_many(self.get_object_permission_required(),
+                                objects, stop_on_denial=True)
+                .get_permitted_objects())
+
+    def get_bulk_denials(self, request, objects, perms=None):
+        """Returns a dict mapping the primary key (or the index, for objects
+        without one) of each object lacking the (object) permissions to its
+        missing permissions, which are evaluated on all objects in one pass.
+        """
+        if perms is None:
+            perms = self.get_object_permission_required()
+        if self.permission_related and hasattr(objects, 'select_related'):
+            objects = select_permission_related(perms, objects)
+
+        # like for a single object, the permissions are evaluated by cost and
+        # only the first missing one is reported unless reporting all
+        report_all = self.report_all_missing_permissions
+        matrix = (self.get_permission_checker(request)
+                  .has_perms_many(sorted(perms, key=get_cost), objects,
+                                  stop_on_denial=not report_all))
+        denials = OrderedDict()
+        for index, obj in enumerate(matrix.objects):
+            missing = matrix.get_missing_permissions(index)
+            if not missing:
+                continue
+            if report_all:
+                missing = [perm for perm in perms if perm in missing]
+            else:
+                missing = missing[:1]
+            pk = getattr(obj, 'pk', None)
+            denials[index if pk is None else pk] = missing
+        return denials
+
+    def check_bulk_object_permissions(self, request, objects):
+        # the bulk counterpart of check_object_permissions, e.g. for bulk
+        # updates, whose error lists the missing permissions of each object
+        denials = self.get_bulk_denials(request, objects)
+        if denials:
+            self.permission_denied(
+                request,
+                message={
+                    'detail': 'MISSING: object permissions on {} objects'
+                              .format(len(denials)),
+                    'objects': denials,
+                })
+
+    def get_missing_permissions(self, request, perms, obj=None):
+        return (self.get_permission_checker(request)
+                .get_missing_permissions(perms, obj))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        metrics = getattr(request, '_permission_metrics', None)
+        if metrics:
+            response['X-Permission-Timing'] = ', '.join(
+                '{permission};dur={duration:.3f};queries={queries};'
+                'allowed={allowed:d}'.format(**metric) for metric in metrics)
+        return response
+
+    def is_async(self):
+        # the async views of adrf call the checks in a thread of their event
+        # loop, where the asynchronous checks are awaited
+        return getattr(self, 'view_is_async', False)
 
     def check_object_permissions(self, request, obj):
-        user = request.user
-        missing_permissions = [
-            perm for perm in self.get_object_permission_required()
-            if not user.has_perm(perm, obj)
-        ]
+        if self.is_async():
+            from asgiref.sync import async_to_sync
+            return async_to_sync(self.acheck_object_permissions)(request, obj)
+
+        missing_permissions = self.get_missing_permissions(
+            request, self.get_object_permission_required(), obj)
         if any(missing_permissions):
             self.permission_denied(
                 request,
                 message=('MISSING: {}'.format(', '.join(missing_permissions))))
 
     def check_permissions(self, request):
-        user = request.user
-        missing_permissions = [perm for perm in self.get_permission_required()
-                               if not user.has_perm(perm)]
+        if self.is_async():
+            from asgiref.sync import async_to_sync
+            return async_to_sync(self.acheck_permissions)(request)
+
+        missing_permissions = self.get_missing_permissions(
+            request, self.get_permission_required())
+        if any(missing_permissions):
+            self.permission_denied(
+                request,
+                message=('MISSING: {}'.format(', '.join(missing_permissions))))
+
+    async def ahas_perm(self, request, perm, obj=None):
+        return await self.get_permission_checker(request).ahas_perm(perm, obj)
+
+    async def aget_missing_permissions(self, request, perms, obj=None):
+        return await (self.get_permission_checker(request)
+                      .aget_missing_permissions(perms, obj))
+
+    async def acheck_object_permissions(self, request, obj):
+        missing_permissions = await self.aget_missing_permissions(
+            request, self.get_object_permission_required(), obj)
+        if any(missing_permissions):
+            self.permission_denied(
+                request,
+                message=('MISSING: {}'.format(', '.join(missing_permissions))))
+
+    async def acheck_permissions(self, request):
+        missing_permissions = await self.aget_missing_permissions(
+            request, self.get_permission_required())
         if any(missing_permissions):
             self.permission_denied(
                 request,
@@ -0,0 +1,201 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import BasePermission
+
+from .evaluation import PermissionChecker
+from .snapshots import get_session_snapshot
+
+
+class PermissionMap(dict):
+
+    """Maps action names, HTTP methods (in upper case) and ``'*'`` to the
+    permissions they require. The permissions of an action and method are
+    looked up in this order and memoized::
+
+        >>> permission_required = {
+        ...     'list': 'climb_app.list_boulders',
+        ...     'POST': 'climb_app.add_boulder',
+        ...     '*': 'climb_app.access_boulders',
+        ... }
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._resolved = {}
+
+    def resolve(self, action, method):
+        key = (action, method)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        perms = None
+        for name in key + ('*', ):
+            if name in self:
+                perms = self[name]
+                break
+        self._resolved[key] = perms
+        return perms
+
+
+def normalize_permissions(perms, name='permission_required'):
+    if perms is None or isinstance(perms, (property, PermissionMap)):
+        return perms
+    if isinstance(perms, str):
+        return (perms, )
+    if isinstance(perms, dict):
+        return PermissionMap(
+            (key, normalize_permissions(value, '{}[{!r}]'.format(name, key)))
+            for key, value in perms.items())
+
+    try:
+        perms = tuple(perms)
+    except TypeError:
+        perms = None
+    if perms is None or not all(isinstance(perm, str) for perm in perms):
+        raise ImproperlyConfigured(
+            '{} must be a permission name, an iterable of permission names '
+            'or a dict mapping actions or methods to them.'.format(name))
+    return perms
+
+
+def resolve_permissions(perms, action, method):
+    if isinstance(perms, PermissionMap):
+        return perms.resolve(action, method)
+    return perms
+
+
+def build_permission_table(view_class):
+    """Returns a dict mapping the name of each action of the view class which
+    requires its own permissions (``None`` for the view itself) to a tuple of
+    the required permissions and object permissions, which are tuples,
+    ``PermissionMap`` objects or ``None``.
+
+    The actions' permissions are the ``permission_required`` and
+    ``object_permission_required`` arguments of ``list_route`` and
+    ``detail_route``, like the ones the routes pass to the views.
+    """
+    perms = normalize_permissions(
+        getattr(view_class, 'permission_required', None))
+    object_perms = normalize_permissions(
+        getattr(view_class, 'object_permission_required', None),
+        'object_permission_required')
+    table = {None: (perms, object_perms)}
+
+    for name in dir(view_class):
+        kwargs = getattr(getattr(view_class, name, None), 'kwargs', None)
+        if not isinstance(kwargs, dict) or not (
+                'permission_required' in kwargs or
+                'object_permission_required' in kwargs):
+            continue
+        table[name] = (
+            normalize_permissions(kwargs.get('permission_required', perms)),
+            normalize_permissions(
+                kwargs.get('object_permission_required', object_perms),
+                'object_permission_required'))
+    return table
+
+
+def get_permission_table(view_class):
+    # built once per view class, subclasses get their own table
+    table = view_class.__dict__.get('_permission_table')
+    if table is None:
+        table = build_permission_table(view_class)
+        view_class._permission_table = table
+    return table
+
+
+def get_view_permissions(view, attribute, perms, initkwargs=True):
+    # the arguments of as_view (set on the view) and the properties are only
+    # known to the view, the table holding the permissions of its class
+    if (initkwargs and attribute in view.__dict__ or
+            isinstance(perms, property)):
+        return normalize_permissions(getattr(view, attribute, None),
+                                     attribute)
+    return perms
+
+
+class RulesPermission(BasePermission):
+
+    """Permission class checking the ``permission_required`` and
+    ``object_permission_required`` of the view (or of the current action) like
+    the ``PermissionRequiredMixin`` does, which allows listing it among the
+    view's ``permission_classes``::
+
+        >>> class BoulderViewSet(ModelViewSet):
+        ...     permission_classes = [RulesPermission]
+        ...     permission_required = 'climb_app.access_boulders'
+        ...     object_permission_required = 'climb_app.change_boulder'
+        ...
+
+    """
+
+    def get_permissions(self, request, view):
+        # returns the permissions and object permissions of the action
+        if hasattr(view, 'get_permission_required'):
+            # e.g. the PermissionRequiredMixin or an override
+            perms = view.get_permission_required()
+            if hasattr(view, 'get_object_permission_required'):
+                return perms, view.get_object_permission_required()
+            return perms, perms
+
+        table = get_permission_table(type(view))
+        action = getattr(view, 'action', None)
+        # the routers pass the arguments of the actions' routes to as_view,
+        # which the table already holds normalized
+        routed = action is not None and action in table
+        perms, object_perms = table[action if routed else None]
+        perms = get_view_permissions(view, 'permission_required', perms,
+                                     initkwargs=not routed)
+        object_perms = get_view_permissions(
+            view, 'object_permission_required', object_perms,
+            initkwargs=not routed)
+
+        perms = resolve_permissions(perms, action, request.method)
+        object_perms = resolve_permissions(object_perms, action,
+                                           request.method)
+        return perms, perms if object_perms is None else object_perms
+
+    def get_permission_checker(self, request, view):
+        if hasattr(view, 'get_permission_checker'):
+            return view.get_permission_checker(request)
+
+        return PermissionChecker(
+            request,
+            cache=getattr(view, 'cache_permissions', False),
+            decision_cache=getattr(view, 'decision_cache', None),
+            denial_cache=getattr(view, 'denial_cache', None),
+            snapshot=(get_session_snapshot(request)
+                      if getattr(view, 'permission_snapshot', False)
+                      else None),
+            report_all=getattr(view, 'report_all_missing_permissions', False),
+            sender=type(view),
+            metrics_callback=getattr(type(view), 'permission_metrics_callback',
+                                     None),
+            trace=getattr(view, 'trace_permissions', False),
+            executor=getattr(view, 'permission_executor', None),
+            timeout=getattr(view, 'permission_timeout', None))
+
+    def check(self, request, view, perms, obj=None):
+        if perms is None:
+            raise ImproperlyConfigured(
+                '{0} is missing the permission_required attribute (or its '
+                'entry for the action). Define {0}.permission_required.'
+                .format(view.__class__.__name__))
+
+        missing_permissions = (self.get_permission_checker(request, view)
+                               .get_missing_permissions(perms, obj))
+        if missing_permissions:
+            # read by the view when denying the request
+            self.message = 'MISSING: {}'.format(', '.join(missing_permissions))
+            return False
+        return True
+
+    def has_permission(self, request, view):
+        return self.check(request, view,
+                          self.get_permissions(request, view)[0])
+
+    def has_object_permission(self, request, view, obj):
+        return self.check(request, view,
+                          self.get_permissions(request, view)[1], obj)
@@ -0,0 +1,625 @@
+import asyncio
+import operator
+
+import rules
+from django.contrib.auth import get_backends
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from rules.permissions import ObjectPermissionBackend, permissions
+from rules.predicates import Context, _context
+
+
+OPERATORS = {
+    'AND': operator.and_,
+    'OR': operator.or_,
+    'XOR': operator.xor,
+}
+
+# well-known classes of users, see get_user_class
+USER_CLASSES = ('anonymous', 'staff', 'superuser')
+
+_batch_implementations = {}
+_constants = {}
+_costs = {}
+_folded = {}
+_prefetch_related = {}
+_queryset_filters = {}
+_select_related = {}
+
+
+def batch(predicate):
+    """Registers a batch implementation of the given predicate.
+
+    The decorated function is called with the user and a list of objects and
+    returns the predicate's results in the order of the objects::
+
+        >>> @batch(is_author)
+        ... def are_authored_by(user, books):
+        ...     return [book.author_id == user.pk for book in books]
+        ...
+
+    """
+    def decorator(fn):
+        _batch_implementations[predicate] = fn
+        return fn
+    return decorator
+
+
+def queryset_filter(predicate):
+    """Registers the ``Q`` object which is equivalent to the predicate.
+
+    The decorated function is called with the user and returns a ``Q`` object
+    selecting the targets for which the predicate is true, a boolean if the
+    result does not depend on the target, or ``None`` if the predicate cannot
+    be compiled for the user (e.g. for the anonymous user, whose result may
+    be declared using ``constant`` instead)::
+
+        >>> @queryset_filter(is_author)
+        ... def authored_by(user):
+        ...     if not user.is_authenticated:
+        ...         return False
+        ...     return Q(author=user)
+        ...
+
+    """
+    def decorator(fn):
+        _queryset_filters[predicate] = fn
+        return fn
+    return decorator
+
+
+def cost(value):
+    """Declares the expected evaluation time of a predicate in milliseconds::
+
+        >>> @cost(5)
+        ... @rules.predicate
+        ... def is_a_climber(user):
+        ...     return Climber.objects.filter(user=user).exists()
+        ...
+
+    """
+    def decorator(predicate):
+        _costs[predicate] = value
+        return predicate
+    return decorator
+
+
+def select_related(*fields):
+    """Declares the foreign keys traversed by a predicate from its target,
+    which are then fetched along with the objects of generic views::
+
+        >>> @select_related('boulder__routesetter')
+        ... @rules.predicate
+        ... def is_related_to_routesetters_boulder(user, content):
+        ...     return content.boulder.routesetter == user
+        ...
+
+    """
+    def decorator(predicate):
+        _select_related.setdefault(predicate, set()).update(fields)
+        return predicate
+    return decorator
+
+
+def prefetch_related(*lookups):
+    """Declares the many-valued relations traversed by a predicate from its
+    target (see ``select_related``).
+    """
+    def decorator(predicate):
+        _prefetch_related.setdefault(predicate, set()).update(lookups)
+        return predicate
+    return decorator
+
+
+def constant(**results):
+    """Declares the result of a predicate for the users of well-known classes
+    (``anonymous``, ``staff`` and ``superuser``, see ``get_user_class``),
+    which is then known without evaluating the predicate::
+
+        >>> @constant(anonymous=False)
+        ... @rules.predicate
+        ... def is_a_climber(user):
+        ...     return Climber.objects.filter(user=user).exists()
+        ...
+
+    """
+    unknown = set(results) - set(USER_CLASSES)
+    if unknown:
+        raise ImproperlyConfigured(
+            'Unknown user classes: {}.'.format(', '.join(sorted(unknown))))
+
+    def decorator(predicate):
+        _constants[predicate] = results
+        _folded.clear()
+        return predicate
+    return decorator
+
+
+def decompose(predicate):
+    """Returns the operator and the operands of a composed predicate, or
+    ``None`` if the predicate is not composed of other predicates.
+    """
+    fn = predicate.fn
+    name = getattr(fn, '__name__', None)
+    if name not in ('AND', 'OR', 'XOR', 'INVERT') or not fn.__closure__:
+        return None
+
+    # the operands are the free variables of the closure defined by rules
+    # when combining predicates using &, |, ^ and ~
+    cells = dict(zip(fn.__code__.co_freevars,
+                     (cell.cell_contents for cell in fn.__closure__)))
+    if name == 'INVERT':
+        return name, (cells['self'], )
+    return name, (cells['self'], cells['other'])
+
+
+def get_declared_cost(predicate):
+    """Returns the sum of the costs declared by the predicates composing the
+    given one, or ``None`` if none of them declared a cost.
+    """
+    if predicate in _costs:
+        return _costs[predicate]
+
+    node = decompose(predicate)
+    if node is None:
+        return None
+
+    costs = [value for value in map(get_declared_cost, node[1])
+             if value is not None]
+    return sum(costs) if costs else None
+
+
+def takes_target(predicate):
+    """Returns whether any of the predicates composing the given one takes a
+    target, i.e. whether the permission may involve an object.
+    """
+    node = decompose(predicate)
+    if node is None:
+        return predicate.var_args or predicate.num_args >= 2
+    return any(takes_target(operand) for operand in node[1])
+
+
+def get_related_lookups(predicate):
+    """Returns the sets of the ``select_related`` fields and
+    ``prefetch_related`` lookups declared by the predicates composing the
+    given one.
+    """
+    fields = set(_select_related.get(predicate, ()))
+    lookups = set(_prefetch_related.get(predicate, ()))
+
+    node = decompose(predicate)
+    if node is not None:
+        for operand in node[1]:
+            operand_fields, operand_lookups = get_related_lookups(operand)
+            fields |= operand_fields
+            lookups |= operand_lookups
+    return fields, lookups
+
+
+def apply(predicate, *args):
+    # invokes the predicate like rules does, preserving skipped (None)
+    # results, which matter when combining results
+    _context.stack.append(Context(args))
+    try:
+        return predicate._apply(*args)
+    finally:
+        _context.stack.pop()
+
+
+def get_callargs(predicate, args):
+    # mirrors the arguments rules passes to the predicate's function
+    if predicate.var_args:
+        callargs = args
+    elif predicate.num_args > len(args):
+        callargs = args + (None, ) * (predicate.num_args - len(args))
+    else:
+        callargs = args[:predicate.num_args]
+    if predicate.bind:
+        callargs = (predicate, ) + callargs
+    return callargs
+
+
+def combine(op, result, other_result):
+    if result is None:
+        return other_result
+    if other_result is None:
+        return result
+    return OPERATORS[op](result, other_result)
+
+
+def is_short_circuited(op, result):
+    return ((op == 'AND' and result is False) or
+            (op == 'OR' and result is True))
+
+
+def evaluate_many(predicate, user, objects):
+    """Evaluates the predicate against each of the objects and returns the
+    results (``True``, ``False`` or ``None`` if skipped) in the same order.
+
+    Batch implementations are used where registered, predicates which do not
+    take a target are evaluated once, and the remaining predicates are
+    evaluated per object. Like rules, the right operand of ``&`` and
+    ``|`` is only evaluated for the objects it can change the result of.
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+
+    node = decompose(predicate)
+    if node is None:
+        implementation = _batch_implementations.get(predicate)
+        if implementation is not None:
+            return [None if result is None else bool(result)
+                    for result in implementation(user, objects)]
+        if not predicate.var_args and predicate.num_args < 2:
+            return [apply(predicate, user)] * len(objects)
+        return [apply(predicate, user, obj) for obj in objects]
+
+    op, operands = node
+    if op == 'INVERT':
+        return [None if result is None else not result
+                for result in evaluate_many(operands[0], user, objects)]
+
+    left, right = operands
+    results = evaluate_many(left, user, objects)
+    pending = [index for index, result in enumerate(results)
+               if not is_short_circuited(op, result)]
+    other_results = evaluate_many(right, user,
+                                  [objects[index] for index in pending])
+    for index, other_result in zip(pending, other_results):
+        results[index] = combine(op, results[index], other_result)
+    return results
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _compile(predicate, user):
+    # returns True or False if the result does not depend on the target, a Q
+    # object if it does, and None if the predicate is skipped
+    node = decompose(predicate)
+    if node is None:
+        fn = _queryset_filters.get(predicate)
+        if fn is not None and not getattr(user, 'is_authenticated', False):
+            # the result declared for anonymous users spares the filter from
+            # handling them
+            result = _constants.get(predicate, {}).get('anonymous')
+            if result is not None:
+                return result
+        if fn is not None:
+            result = fn(user)
+            if result is None:
+                raise NotCompilable(predicate)
+            return result
+        if not predicate.var_args and predicate.num_args < 2:
+            return apply(predicate, user)
+        raise NotCompilable(predicate)
+
+    op, operands = node
+    if op == 'INVERT':
+        result = _compile(operands[0], user)
+        if result is None:
+            return None
+        return not result if isinstance(result, bool) else ~result
+
+    left, right = operands
+    result = _compile(left, user)
+    if is_short_circuited(op, result):
+        return result
+    other_result = _compile(right, user)
+    if result is None:
+        return other_result
+    if other_result is None:
+        return result
+
+    if isinstance(result, bool) or isinstance(other_result, bool):
+        constant, q = ((result, other_result) if isinstance(result, bool)
+                       else (other_result, result))
+        if isinstance(q, bool):
+            return OPERATORS[op](constant, q)
+        if op == 'AND':
+            return q if constant else False
+        if op == 'OR':
+            return True if constant else q
+        return ~q if constant else q
+
+    if op == 'XOR':
+        return (result & ~other_result) | (~result & other_result)
+    return OPERATORS[op](result, other_result)
+
+
+def compile_q(predicate, user):
+    """Compiles the predicate into a filter selecting the targets for which
+    the predicate is true for the given user.
+
+    Returns ``True`` if all targets are selected, ``False`` if none is, a ``Q``
+    object otherwise, or ``None`` if the predicate cannot be compiled because
+    one of its predicates takes a target and has no registered ``Q`` object
+    (or, for unauthenticated users, no result declared using ``constant``).
+    """
+    try:
+        result = _compile(predicate, user)
+    except NotCompilable:
+        return None
+    return False if result is None else result
+
+
+def is_async(predicate):
+    """Returns whether any of the predicates composing the given one is a
+    coroutine function.
+    """
+    node = decompose(predicate)
+    if node is None:
+        return asyncio.iscoroutinefunction(predicate.fn)
+    return any(is_async(operand) for operand in node[1])
+
+
+async def aevaluate(predicate, user, obj=None):
+    """Evaluates the predicate like rules does, awaiting the predicates which
+    are coroutine functions and running the others in a thread.
+    """
+    node = decompose(predicate)
+    if node is None:
+        if asyncio.iscoroutinefunction(predicate.fn):
+            result = await predicate.fn(*get_callargs(predicate, (user, obj)))
+            return None if result is None else bool(result)
+
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(apply)(predicate, user, obj)
+
+    op, operands = node
+    if op == 'INVERT':
+        result = await aevaluate(operands[0], user, obj)
+        return None if result is None else not result
+
+    left, right = operands
+    result = await aevaluate(left, user, obj)
+    if is_short_circuited(op, result):
+        return result
+    return combine(op, result, await aevaluate(right, user, obj))
+
+
+async def ahas_perm(user, perm, obj=None):
+    """Asynchronous version of ``user.has_perm(perm, obj)``.
+
+    Permissions registered with rules and composed of coroutine functions are
+    evaluated using ``aevaluate``, the others are checked in a thread.
+    """
+    if perm in permissions and is_async(permissions[perm]):
+        if is_active_superuser(user):
+            return True
+        return bool(await aevaluate(permissions[perm], user, obj))
+
+    from asgiref.sync import sync_to_async
+    return await sync_to_async(user.has_perm)(perm, obj)
+
+
+def is_active_superuser(user):
+    return (getattr(user, 'is_active', False) and
+            getattr(user, 'is_superuser', False))
+
+
+def get_user_class(user):
+    """Returns the well-known class of the user: ``superuser`` (active
+    superusers), ``anonymous`` (unauthenticated users), ``staff`` (other
+    active staff users) or ``None``.
+    """
+    if is_active_superuser(user):
+        return 'superuser'
+    if not getattr(user, 'is_authenticated', False):
+        return 'anonymous'
+    if getattr(user, 'is_active', False) and getattr(user, 'is_staff', False):
+        return 'staff'
+    return None
+
+
+def fold(predicate, user_class):
+    """Returns the result of the predicate for the users of the class, as
+    folded from the results declared by the predicates composing it, or
+    ``None`` if the result depends on the user or target.
+    """
+    if predicate in _constants:
+        return _constants[predicate].get(user_class)
+
+    node = decompose(predicate)
+    if node is None:
+        return None
+
+    op, operands = node
+    results = [fold(operand, user_class) for operand in operands]
+    if op == 'INVERT':
+        return None if results[0] is None else not results[0]
+    if op == 'AND' and False in results:
+        return False
+    if op == 'OR' and True in results:
+        return True
+    if None in results:
+        return None
+    return OPERATORS[op](*results)
+
+
+def get_constant_decision(user, perm):
+    """Returns the decision on the permission which is known from the class
+    of the user without evaluating any predicate, or ``None``.
+
+    The decisions are folded once per permission and user class. Denials are
+    only folded for anonymous users, as other authentication backends may
+    grant the permission to authenticated users.
+    """
+    user_class = get_user_class(user)
+    if user_class is None:
+        return None
+    if user_class == 'superuser':
+        # mirrors django.contrib.auth, active superusers have all permissions
+        return True
+    if perm not in permissions:
+        return None
+
+    # keyed by the predicate too, which may be replaced by registering the
+    # permission again
+    predicate = permissions[perm]
+    key = (perm, predicate, user_class)
+    try:
+        decision = _folded[key]
+    except KeyError:
+        decision = _folded[key] = fold(predicate, user_class)
+    if decision is False and user_class != 'anonymous':
+        return None
+    return decision
+
+
+# The results of the predicates provided by rules
+
+constant(anonymous=False, staff=True, superuser=True)(rules.is_authenticated)
+constant(anonymous=False, staff=True, superuser=True)(rules.is_active)
+constant(anonymous=False, staff=True)(rules.is_staff)
+constant(anonymous=False, staff=False, superuser=True)(rules.is_superuser)
+constant(anonymous=True, staff=True, superuser=True)(rules.always_true)
+constant(anonymous=True, staff=True, superuser=True)(rules.always_allow)
+constant(anonymous=False, staff=False, superuser=False)(rules.always_false)
+constant(anonymous=False, staff=False, superuser=False)(rules.always_deny)
+
+
+def get_other_backends():
+    # the authentication backends checking permissions besides rules' one
+    return [backend for backend in get_backends()
+            if hasattr(backend, 'has_perm') and
+            not isinstance(backend, ObjectPermissionBackend)]
+
+
+def has_backend_perm(backends, user, perm, obj=None):
+    """Checks the permission using the given backends like
+    ``user.has_perm`` does.
+    """
+    for backend in backends:
+        try:
+            if backend.has_perm(user, perm, obj):
+                return True
+        except PermissionDenied:
+            return False
+    return False
+
+
+def has_perm_many(user, perm, objects):
+    """Checks whether the user has the permission on each of the objects.
+
+    Permissions registered with rules are evaluated using ``evaluate_many``,
+    their denials being confirmed by the other authentication backends, and
+    other permissions are checked per object using ``user.has_perm``.
+    """
+    objects = list(objects)
+    decision = get_constant_decision(user, perm)
+    if decision is not None:
+        return [decision] * len(objects)
+    if perm not in permissions:
+        return [user.has_perm(perm, obj) for obj in objects]
+
+    decisions = [bool(result)
+                 for result in evaluate_many(permissions[perm], user, objects)]
+    backends = get_other_backends()
+    if backends and not all(decisions):
+        decisions = [decision or has_backend_perm(backends, user, perm, obj)
+                     for decision, obj in zip(decisions, objects)]
+    return decisions
+
+
+def permissions_to_q(user, perms):
+    """Compiles the permissions into a single filter (see ``compile_q``) or
+    returns ``None`` if any of the permissions cannot be compiled.
+    """
+    if is_active_superuser(user):
+        return True
+
+    combined = True
+    for perm in perms:
+        decision = get_constant_decision(user, perm)
+        if decision is False:
+            return False
+        if decision:
+            continue
+        if perm not in permissions:
+            return None
+        result = compile_q(permissions[perm], user)
+        if result is None:
+            return None
+        if result is False:
+            return False
+        if result is not True:
+            combined = result if combined is True else combined & result
+    return combined
+
+
+class DecisionMatrix:
+
+    """The decisions on permissions (rows) and objects (columns), each row
+    being stored as a bitmask of the objects on which the permission is
+    granted.
+    """
+
+    def __init__(self, perms, objects, masks):
+        self.perms = tuple(perms)
+        self.objects = list(objects)
+        self.masks = dict(zip(self.perms, masks))
+
+    def has_perm(self, perm, index):
+        return bool(self.masks[perm] >> index & 1)
+
+    def get_row(self, perm):
+        return [self.has_perm(perm, index)
+                for index in range(len(self.objects))]
+
+    def get_missing_permissions(self, index):
+        return [perm for perm in self.perms
+                if not self.has_perm(perm, index)]
+
+    def get_permitted_objects(self):
+        # the objects on which all the permissions are granted
+        mask = (1 << len(self.objects)) - 1
+        for perm in self.perms:
+            mask &= self.masks[perm]
+        return [obj for index, obj in enumerate(self.objects)
+                if mask >> index & 1]
+
+
+def has_perms_many(user, perms, objects, stop_on_denial=False, cache=None):
+    """Checks the permissions on the objects and returns a ``DecisionMatrix``.
+
+    Each permission is checked on all objects at once (see
+    ``has_perm_many``). If ``stop_on_denial`` is set, a permission is only
+    checked on the objects which have the preceding permissions, the others
+    are denied. If a ``PermissionCache`` is given, its decisions are reused
+    and the new ones are stored in it.
+    """
+    objects = list(objects)
+    candidates = list(range(len(objects)))
+    masks = []
+    for perm in perms:
+        mask = 0
+        pending = []
+        for index in candidates:
+            decision = None if cache is None else cache.get(perm,
+                                                            objects[index])
+            if decision is None:
+                pending.append(index)
+            elif decision:
+                mask |= 1 << index
+
+        decisions = has_perm_many(user, perm,
+                                  [objects[index] for index in pending])
+        for index, decision in zip(pending, decisions):
+            if cache is not None:
+                cache.set(perm, objects[index], decision)
+            if decision:
+                mask |= 1 << index
+
+        masks.append(mask)
+        if stop_on_denial:
+            candidates = [index for index in candidates if mask >> index & 1]
+    return DecisionMatrix(perms, objects, masks)
+
+
+def filter_objects(user, perms, objects, cache=None):
+    """Returns the objects on which the user has all the permissions.
+    """
+    return has_perms_many(user, perms, objects, stop_on_denial=True,
+                          cache=cache).get_permitted_objects()
@@ -0,0 +1,200 @@
+import re
+from collections import namedtuple
+from time import perf_counter
+
+from .evaluation import count_queries
+from .mixins import PermissionRequiredMixin
+from .permissions import (RulesPermission, get_permission_table,
+                          normalize_permissions, resolve_permissions)
+from .predicates import get_constant_decision
+from .tracing import trace_permission
+
+
+# the permissions checked when requesting a route with a method, the object
+# permissions being checked on sample objects of the view's queryset, or on
+# the ones resolved by the object_fn of the permission_required decorator
+Endpoint = namedtuple('Endpoint', ['route', 'method', 'action', 'view_class',
+                                   'permissions', 'object_permissions',
+                                   'object_fn'])
+
+
+def get_pattern(pattern):
+    # django < 2.0 has no pattern attribute
+    if hasattr(pattern, 'pattern'):
+        return str(pattern.pattern)
+    return pattern.regex.pattern
+
+
+def get_routes(patterns, prefix=''):
+    """Yields the route and the view of each pattern of the URLconf.
+    """
+    for pattern in patterns:
+        route = prefix + get_pattern(pattern).lstrip('^')
+        if hasattr(pattern, 'url_patterns'):
+            yield from get_routes(pattern.url_patterns, route)
+        else:
+            yield route.rstrip('$'), pattern.callback
+
+
+def get_handlers(view):
+    # the methods and actions of viewsets or the methods of views
+    actions = getattr(view, 'actions', None)
+    if actions:
+        return sorted((method.upper(), action)
+                      for method, action in actions.items())
+    return [(method.upper(), None) for method in view.cls.http_method_names
+            if method != 'options' and hasattr(view.cls, method)]
+
+
+def checks_class_permissions(cls):
+    if issubclass(cls, PermissionRequiredMixin):
+        return True
+    return any(isinstance(permission_class, type) and
+               issubclass(permission_class, RulesPermission)
+               for permission_class in getattr(cls, 'permission_classes', ()))
+
+
+def get_tuple(perms):
+    # the permissions returned by overridden methods cannot be planned
+    return perms if isinstance(perms, tuple) else ()
+
+
+def get_permission_plan(route, view):
+    """Returns the ``Endpoint`` of each method of the routed view which
+    requires permissions.
+
+    The permissions are the view's attributes (or the ones of the action)
+    and the ones of the handlers decorated using ``permission_required``,
+    which are planned as object permissions if the decorator resolves an
+    object (``fn``, the endpoint's ``object_fn``).
+    """
+    cls = getattr(view, 'cls', None)
+    if cls is None:
+        return []
+
+    initkwargs = getattr(view, 'initkwargs', {})
+    table = get_permission_table(cls) if checks_class_permissions(cls) else {}
+    lookup = getattr(cls, 'lookup_url_kwarg', None) or getattr(
+        cls, 'lookup_field', None)
+    is_detail = (hasattr(cls, 'get_object') and lookup is not None and
+                 re.search(r'<(\w+:)?{}>'.format(lookup), route) is not None)
+
+    endpoints = []
+    for method, action in get_handlers(view):
+        perms, object_perms = table.get(action, table.get(None, (None, None)))
+        perms = normalize_permissions(
+            initkwargs.get('permission_required', perms))
+        object_perms = normalize_permissions(
+            initkwargs.get('object_permission_required', object_perms),
+            'object_permission_required')
+        perms = get_tuple(resolve_permissions(perms, action, method))
+        object_perms = resolve_permissions(object_perms, action, method)
+        object_perms = perms if object_perms is None else get_tuple(
+            object_perms)
+
+        if not is_detail:
+            object_perms = ()
+        handler = getattr(cls, action or method.lower(), None)
+        decorated = get_tuple(getattr(handler, 'permission_required', None))
+        object_fn = getattr(handler, 'permission_fn', None)
+        if object_fn is None:
+            perms += decorated
+        else:
+            object_perms += decorated
+        if perms or object_perms:
+            endpoints.append(Endpoint(route, method, action, cls, perms,
+                                      object_perms, object_fn))
+    return endpoints
+
+
+def profile_permission(user, perm, obj=None):
+    """Checks the permission like the views do and returns the decision, the
+    duration in milliseconds, the number of queries and the
+    ``PermissionTrace`` of the evaluation (``None`` if the decision is known
+    from the class of the user).
+    """
+    decision = get_constant_decision(user, perm)
+    if decision is not None:
+        return decision, 0, 0, None
+
+    with count_queries() as queries:
+        start = perf_counter()
+        permission_trace = trace_permission(user, perm, obj)
+        duration = (perf_counter() - start) * 1000
+    return (permission_trace.allowed, duration, queries.count,
+            permission_trace)
+
+
+def get_leaves(node):
+    # the evaluated predicates which are not composed of other predicates
+    if node.short_circuited:
+        return
+    if not node.children:
+        yield node
+    for child in node.children:
+        yield from get_leaves(child)
+
+
+class EndpointProfile:
+
+    """The latency and number of queries of the permission checks of an
+    endpoint's requests, each request checking all the permissions. Without
+    objects, the object permissions are not profiled (see ``unprofiled``).
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.durations = []
+        self.queries = 0
+        # the object permissions which could not be checked on any object
+        self.unprofiled = ()
+        # maps the names of the predicates to their total duration and calls
+        self.predicates = {}
+
+    def check(self, user, perm, obj=None):
+        decision, duration, queries, permission_trace = profile_permission(
+            user, perm, obj)
+        if permission_trace is not None and permission_trace.root is not None:
+            for leaf in get_leaves(permission_trace.root):
+                total, calls = self.predicates.get(leaf.name, (0, 0))
+                self.predicates[leaf.name] = (total + leaf.duration,
+                                              calls + 1)
+        return duration, queries or 0
+
+    def request(self, user, obj=None):
+        duration = queries = 0
+        checks = [(perm, None) for perm in self.endpoint.permissions]
+        if obj is not None:
+            checks += [(perm, obj)
+                       for perm in self.endpoint.object_permissions]
+        for perm, checked_obj in checks:
+            check_duration, check_queries = self.check(user, perm,
+                                                       checked_obj)
+            duration += check_duration
+            queries += check_queries
+        self.durations.append(duration)
+        self.queries = max(self.queries, queries)
+
+    def run(self, users, objects, iterations):
+        if not objects:
+            self.unprofiled = self.endpoint.object_permissions
+        if not self.endpoint.object_permissions or not objects:
+            objects = [None]
+        if not self.endpoint.permissions and self.unprofiled:
+            # nothing would be checked
+            return self
+        for iteration in range(iterations):
+            for user in users:
+                for obj in objects:
+                    self.request(user, obj)
+        return self
+
+    @property
+    def median(self):
+        durations = sorted(self.durations)
+        return durations[len(durations) // 2] if durations else 0
+
+    @property
+    def p95(self):
+        durations = sorted(self.durations)
+        return durations[int(len(durations) * 0.95)] if durations else 0
@@ -0,0 +1,107 @@
+from django.db.models import Manager
+from rest_framework.serializers import LIST_SERIALIZER_KWARGS, ListSerializer
+
+from .cache import get_request_cache
+from .permissions import normalize_permissions
+from .predicates import has_perms_many
+
+
+# the arguments of many=True serializers which are not passed to the child
+LIST_ONLY_KWARGS = ('allow_empty', 'max_length', 'min_length')
+
+
+class FieldPermissionsMixin:
+
+    """Omits the fields for which the request's user lacks the permissions
+    declared in ``Meta.field_permissions`` on the represented object::
+
+        >>> class BoulderSerializer(FieldPermissionsMixin, ModelSerializer):
+        ...     class Meta:
+        ...         model = Boulder
+        ...         fields = '__all__'
+        ...         field_permissions = {'grade': 'climb_app.grade_boulder'}
+        ...
+
+    The decisions are stored in the request cache, which is shared with the
+    view and the nested serializers. When representing a list (see
+    ``FieldPermissionsListSerializer``), the permissions are evaluated on all
+    objects at once. Without a request in the context, the fields are
+    omitted.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # lists, including the nested ones, prime the field permissions,
+        # unless Meta declares another list_serializer_class
+        if hasattr(getattr(cls, 'Meta', None), 'list_serializer_class'):
+            return super().many_init(*args, **kwargs)
+
+        # like rest_framework's many_init
+        list_kwargs = {key: kwargs.pop(key) for key in LIST_ONLY_KWARGS
+                       if kwargs.get(key) is not None}
+        list_kwargs['child'] = cls(*args, **kwargs)
+        list_kwargs.update((key, value) for key, value in kwargs.items()
+                           if key in LIST_SERIALIZER_KWARGS)
+        return FieldPermissionsListSerializer(*args, **list_kwargs)
+
+    def get_field_permissions(self):
+        # normalized once per serializer class
+        cls = type(self)
+        try:
+            return cls.__dict__['_field_permissions']
+        except KeyError:
+            pass
+
+        meta = getattr(cls, 'Meta', None)
+        field_permissions = {
+            field: normalize_permissions(
+                perms, 'Meta.field_permissions[{!r}]'.format(field))
+            for field, perms
+            in getattr(meta, 'field_permissions', {}).items()
+        }
+        cls._field_permissions = field_permissions
+        return field_permissions
+
+    def prime_field_permissions(self, request, objects):
+        perms = {perm for field_perms in self.get_field_permissions().values()
+                 for perm in field_perms}
+        has_perms_many(request.user, perms, objects,
+                       cache=get_request_cache(request))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        field_permissions = self.get_field_permissions()
+        if not field_permissions:
+            return data
+
+        request = self.context.get('request')
+        if request is None:
+            for field in field_permissions:
+                data.pop(field, None)
+            return data
+
+        cache = get_request_cache(request)
+        for field, perms in field_permissions.items():
+            if field in data and not all(
+                    cache.has_perm(request.user, perm, instance)
+                    for perm in perms):
+                del data[field]
+        return data
+
+
+class FieldPermissionsListSerializer(ListSerializer):
+
+    """Evaluates the field permissions of its child on all represented
+    objects at once, before representing them. The ``FieldPermissionsMixin``
+    uses it unless ``Meta.list_serializer_class`` is declared, which should
+    then subclass it.
+    """
+
+    def to_representation(self, data):
+        request = self.context.get('request')
+        if request is not None and hasattr(self.child,
+                                           'prime_field_permissions'):
+            # represents the primed objects, which are fetched once
+            data = list(data.all() if isinstance(data, Manager) else data)
+            self.child.prime_field_permissions(request, data)
+        return super().to_representation(data)
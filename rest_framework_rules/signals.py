@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+
+# Sent after evaluating a permission, with the arguments request, user,
+# permission, obj, allowed, duration (in milliseconds) and queries (the number
+# of database queries, or None if the database backend does not support
+# counting them). The sender is the view's class.
+permission_checked = Signal()
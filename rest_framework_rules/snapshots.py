@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from rules.permissions import permissions
+
+from .predicates import takes_target
+
+
+SESSION_KEY = '_permission_snapshot'
+VERSION_KEY = 'rest_framework_rules:snapshot_version'
+# the seconds after which a snapshot is stale, which bounds how long a
+# process missing the invalidation (e.g. with a process-local cache) keeps
+# answering from the snapshots taken before it
+DEFAULT_MAX_AGE = 300
+
+
+def get_max_age():
+    return getattr(settings, 'REST_FRAMEWORK_RULES_SNAPSHOT_MAX_AGE',
+                   DEFAULT_MAX_AGE)
+
+
+def get_cache():
+    from django.core.cache import cache
+    return cache
+
+
+def get_version():
+    # a missing (e.g. evicted) version restarts from the current time, which
+    # invalidates the snapshots taken with older versions
+    return get_cache().get_or_set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def invalidate_snapshots(sender=None, **kwargs):
+    """Invalidates all snapshots, which can be connected to signals::
+
+        >>> post_save.connect(invalidate_snapshots, sender=RouteSetter)
+
+    """
+    try:
+        get_cache().incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+
+
+def get_user_permissions():
+    # the permissions of the rules registry which do not involve an object
+    return [perm for perm in permissions
+            if not takes_target(permissions[perm])]
+
+
+class PermissionSnapshot:
+
+    """The decisions on the permissions not involving an object, taken once
+    for a user (e.g. at login) and stamped with the version of the snapshots
+    and the time they were taken at.
+    """
+
+    def __init__(self, user_pk, version, granted, denied, taken_at=None):
+        self.user_pk = user_pk
+        self.version = version
+        self.granted = frozenset(granted)
+        self.denied = frozenset(denied)
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+    @classmethod
+    def take(cls, user, perms=None):
+        if perms is None:
+            perms = get_user_permissions()
+        version = get_version()
+        granted, denied = [], []
+        for perm in perms:
+            (granted if user.has_perm(perm) else denied).append(perm)
+        return cls(str(user.pk), version, granted, denied)
+
+    @classmethod
+    def load(cls, data, user, max_age=None):
+        # returns None if there is no snapshot of the user, or if it is stale
+        # (invalidated or older than max_age seconds, see get_max_age)
+        if not data or data.get('user') != str(user.pk):
+            return None
+        if max_age is None:
+            max_age = get_max_age()
+        if time.time() - data.get('taken_at', 0) > max_age:
+            return None
+        if data.get('version') != get_version():
+            return None
+        return cls(data['user'], data['version'], data['granted'],
+                   data['denied'], data['taken_at'])
+
+    def dump(self):
+        return {
+            'user': self.user_pk,
+            'version': self.version,
+            'granted': sorted(self.granted),
+            'denied': sorted(self.denied),
+            'taken_at': self.taken_at,
+        }
+
+    def get(self, perm):
+        # returns the decision or None if the permission is not part of it
+        if perm in self.granted:
+            return True
+        if perm in self.denied:
+            return False
+        return None
+
+
+def store_snapshot(sender, request, user, **kwargs):
+    """Stores the snapshot of the user in the session, which can be connected
+    to the ``user_logged_in`` signal::
+
+        >>> user_logged_in.connect(store_snapshot)
+
+    """
+    request.session[SESSION_KEY] = PermissionSnapshot.take(user).dump()
+
+
+def get_session_snapshot(request):
+    # loaded once per request
+    try:
+        return request._permission_snapshot
+    except AttributeError:
+        pass
+
+    session = getattr(request, 'session', None)
+    snapshot = None
+    if session is not None:
+        snapshot = PermissionSnapshot.load(session.get(SESSION_KEY),
+                                           request.user)
+    request._permission_snapshot = snapshot
+    return snapshot
@@ -0,0 +1,132 @@
+import logging
+from time import perf_counter
+
+from rules.permissions import permissions
+
+from .evaluation import count_queries
+from .predicates import apply, combine, decompose, get_other_backends, \
+    has_backend_perm, is_active_superuser, is_short_circuited
+
+
+logger = logging.getLogger('rest_framework_rules.tracing')
+
+
+class TraceNode:
+
+    """The evaluation of a predicate: its result (``None`` if skipped by the
+    predicate), duration in milliseconds, number of queries and the nodes of
+    its operands. Nodes which were not evaluated because of short-circuiting
+    are marked as ``short_circuited``.
+    """
+
+    def __init__(self, name, op=None, children=(), result=None, duration=0,
+                 queries=0, short_circuited=False):
+        self.name = name
+        self.op = op
+        self.children = list(children)
+        self.result = result
+        self.duration = duration
+        self.queries = queries
+        self.short_circuited = short_circuited
+
+    def format(self, depth=0):
+        if self.short_circuited:
+            line = '{}: short-circuited'.format(self.name)
+        else:
+            line = '{}: {} ({:.3f} ms, {} queries)'.format(
+                self.name, self.result, self.duration, self.queries)
+        lines = ['  ' * depth + line]
+        for child in self.children:
+            lines.append(child.format(depth + 1))
+        return '\n'.join(lines)
+
+
+class PermissionTrace:
+
+    def __init__(self, permission, obj, allowed, root=None):
+        self.permission = permission
+        self.obj = obj
+        self.allowed = allowed
+        # None if no predicate was evaluated (e.g. for superusers)
+        self.root = root
+
+    def format(self):
+        header = '{} on {!r}: {}'.format(self.permission, self.obj,
+                                         self.allowed)
+        if self.root is None:
+            return header
+        return '{}\n{}'.format(header, self.root.format(1))
+
+
+def get_node_name(predicate, op):
+    return predicate.name if op is None else op
+
+
+def short_circuited(predicate):
+    node = decompose(predicate)
+    op, operands = node if node is not None else (None, ())
+    return TraceNode(get_node_name(predicate, op), op,
+                     map(short_circuited, operands), short_circuited=True)
+
+
+def trace(predicate, user, obj=None):
+    """Evaluates the predicate like rules does and returns the result along
+    with the ``TraceNode`` of the evaluation.
+    """
+    node = decompose(predicate)
+    op, operands = node if node is not None else (None, ())
+    with count_queries() as queries:
+        start = perf_counter()
+        children = []
+        if op is None:
+            result = apply(predicate, user, obj)
+        elif op == 'INVERT':
+            result, child = trace(operands[0], user, obj)
+            children.append(child)
+            result = None if result is None else not result
+        else:
+            left, right = operands
+            result, child = trace(left, user, obj)
+            children.append(child)
+            if is_short_circuited(op, result):
+                children.append(short_circuited(right))
+            else:
+                other_result, child = trace(right, user, obj)
+                children.append(child)
+                result = combine(op, result, other_result)
+        duration = (perf_counter() - start) * 1000
+
+    if result is not None:
+        result = bool(result)
+    return result, TraceNode(get_node_name(predicate, op), op, children,
+                             result, duration, queries.count)
+
+
+def trace_permission(user, perm, obj=None):
+    """Checks the permission like ``user.has_perm`` and returns a
+    ``PermissionTrace`` of the evaluation of its predicates.
+
+    Like ``user.has_perm``, the denials of the predicates are checked by the
+    other authentication backends, which may still grant the permission.
+    """
+    if is_active_superuser(user) or perm not in permissions:
+        return PermissionTrace(perm, obj, user.has_perm(perm, obj))
+
+    result, root = trace(permissions[perm], user, obj)
+    allowed = bool(result) or has_backend_perm(get_other_backends(), user,
+                                               perm, obj)
+    return PermissionTrace(perm, obj, allowed, root)
+
+
+def record_trace(request, permission_trace):
+    # the traces are available from the request and logged at debug level
+    try:
+        request._permission_traces.append(permission_trace)
+    except AttributeError:
+        request._permission_traces = [permission_trace]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(permission_trace.format())
+
+
+def get_traces(request):
+    return getattr(request, '_permission_traces', [])
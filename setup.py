@@ -33,8 +33,14 @@ setup(
     maintainer='Pablo Escodebar',
     maintainer_email='escodebar@gmail.com',
     license='MIT',
-    packages=['rest_framework_rules'],
+    packages=['rest_framework_rules',
+              'rest_framework_rules.management',
+              'rest_framework_rules.management.commands'],
     install_requires=['django', 'rules'],
+    extras_require={
+        # the async views of adrf, which requires django >= 4.1
+        'async': ['adrf', 'asgiref'],
+    },
     python_requires='>=3.5.*, <4',
     py_modules=['six'],
     classifiers=[
@@ -0,0 +1,36 @@
+from __future__ import absolute_import
+
+import rules
+from adrf.generics import GenericAPIView
+from adrf.viewsets import ViewSet
+from rest_framework.response import Response
+from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.mixins import PermissionRequiredMixin
+from testapp.models import Book
+from testapp.serializers import BookSerializer
+
+
+@rules.predicate
+async def is_anton_async(user):
+    return user.username == 'anton'
+
+
+rules.add_perm('testapp.access_async_view', is_anton_async)
+
+
+class AsyncPermissionView(PermissionRequiredMixin, GenericAPIView):
+    object_permission_required = 'testapp.access_own_book'
+    permission_required = 'testapp.access_async_view'
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+    async def get(self, request, *args, **kwargs):
+        book = await self.aget_object()
+        return Response({'pk': book.pk})
+
+
+class AsyncDecoratedViewSet(ViewSet):
+
+    @permission_required('testapp.access_async_view')
+    async def list(self, request):
+        return Response({'the man': 'you'})
@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
 import rules
+from django.db.models import Q
+from rest_framework_rules.predicates import (batch, constant,
+                                             queryset_filter, select_related)
 
 
 # Predicates
@@ -17,11 +20,32 @@ def is_beatrix(user, target):
 def is_carlos(user, target):
     return user.username == 'carlos'
 
+@constant(anonymous=False)
 @rules.predicate
 def is_author(user, target):
     return user == target.author
 
 
+# Batch implementations
+
+@batch(is_author)
+def are_authored(user, targets):
+    # compares the foreign key, avoiding to load the author of each target
+    return [user.pk == target.author_id for target in targets]
+
+
+# Queryset filters
+
+@queryset_filter(is_author)
+def authored_by(user):
+    return Q(author=user)
+
+
+# Related lookups
+
+select_related('author')(is_author)
+
+
 # Permissions
 
 rules.add_perm('testapp.access_single_permission_view', is_anton)
@@ -50,3 +74,7 @@ rules.add_perm('testapp.access_single_permission_generic_viewset', is_anton)
 rules.add_perm('testapp.access_single_permission_detail_route', is_anton)
 rules.add_perm('testapp.access_multiple_permissions_detail_route_1', is_anton)
 rules.add_perm('testapp.access_multiple_permissions_detail_route_2', is_anton | is_beatrix)
+
+rules.add_perm('testapp.list_books', rules.is_authenticated)
+rules.add_perm('testapp.access_own_book', is_author)
+rules.add_perm('testapp.access_own_book_or_staff', is_author | rules.is_staff)
@@ -1,4 +1,6 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_rules.serializers import FieldPermissionsMixin
 from .models import Book
 
 
@@ -11,3 +13,20 @@ class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = '__all__'
+
+
+class GuardedBookSerializer(FieldPermissionsMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Book
+        fields = '__all__'
+        field_permissions = {'title': 'testapp.access_own_book'}
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+
+    books = GuardedBookSerializer(many=True, read_only=True, source='book_set')
+
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'username', 'books')
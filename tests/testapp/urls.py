@@ -20,6 +20,18 @@ router.register(r'single_permission_generic_viewset',
 router.register(r'multiple_permissions_generic_viewset',
                 viewsets.MultiplePermissionsGenericViewSet,
                 base_name='multiple_permissions_generic_viewset')
+router.register(r'scoped_generic_viewset',
+                viewsets.ScopedGenericViewSet,
+                base_name='scoped_generic_viewset')
+router.register(r'decorated_generic_viewset',
+                viewsets.DecoratedGenericViewSet,
+                base_name='decorated_generic_viewset')
+router.register(r'mapped_permissions_generic_viewset',
+                viewsets.MappedPermissionsGenericViewSet,
+                base_name='mapped_permissions_generic_viewset')
+router.register(r'rules_permission_viewset',
+                viewsets.RulesPermissionViewSet,
+                base_name='rules_permission_viewset')
 router.register(r'decorated_viewset',
                 viewsets.DecoratedViewSet,
                 base_name='decorated_viewset')
@@ -43,6 +55,21 @@ urlpatterns = [
     url(r'^multiple_permissions_generic_view/(?P<pk>[0-9]+)/$',
         views.MultiplePermissionsGenericView.as_view(),
         name='multiple_permissions_generic_view'),
+    url(r'^cached_permissions_generic_view/(?P<pk>[0-9]+)/$',
+        views.CachedPermissionsGenericView.as_view(),
+        name='cached_permissions_generic_view'),
+    url(r'^filtered_books_view/$',
+        views.FilteredBooksView.as_view(),
+        name='filtered_books_view'),
+    url(r'^filtered_books_view/(?P<pk>[0-9]+)/$',
+        views.FilteredBookView.as_view(),
+        name='filtered_book_view'),
+    url(r'^instrumented_view/$',
+        views.InstrumentedView.as_view(),
+        name='instrumented_view'),
+    url(r'^snapshot_permission_view/$',
+        views.SnapshotPermissionView.as_view(),
+        name='snapshot_permission_view'),
     url(r'^improperly_configured_api_view/$',
         views.ImproperlyConfiguredAPIView.as_view(),
         name='improperly_configured_api_view'),
@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
-from rest_framework.generics import GenericAPIView
+from rest_framework.generics import (GenericAPIView, ListAPIView,
+                                     RetrieveAPIView)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.filters import ObjectPermissionsFilter
 from rest_framework_rules.mixins import PermissionRequiredMixin
+from rest_framework_rules.permissions import RulesPermission
 from testapp.models import Book
 from testapp.serializers import BookSerializer
 
@@ -85,3 +88,70 @@ class MultiplePermissionsGenericView(PermissionRequiredMixin,
     object_permission_required = ('testapp.access_multiple_permissions_object_1',
                                   'testapp.access_multiple_permissions_object_2')
     permission_required = 'testapp.access_multiple_permissions_generic_view'
+
+
+class CachedPermissionsGenericView(PermissionRequiredMixin,
+                                   GenericSimpleResponseMixin,
+                                   GenericAPIView):
+    cache_permissions = True
+    object_permission_required = ('testapp.access_multiple_permissions_object_1',
+                                  'testapp.access_multiple_permissions_object_2')
+    permission_required = 'testapp.access_multiple_permissions_generic_view'
+
+    def post(self, request, *args, **kwargs):
+        # fetching the object twice evaluates the object permissions once
+        self.get_object()
+        return super().post(request, *args, **kwargs)
+
+
+class CachedObjectGenericView(PermissionRequiredMixin,
+                              GenericSimpleResponseMixin,
+                              GenericAPIView):
+    cache_object = True
+    cache_permissions = True
+    object_permission_required = 'testapp.access_single_permission_object'
+    permission_required = 'testapp.access_single_permission_generic_view'
+
+
+class FilteredBooksView(PermissionRequiredMixin, ListAPIView):
+    filter_backends = (ObjectPermissionsFilter, )
+    object_permission_required = 'testapp.access_own_book'
+    permission_required = 'testapp.list_books'
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+
+class FilteredBookView(PermissionRequiredMixin, RetrieveAPIView):
+    filter_backends = (ObjectPermissionsFilter, )
+    object_permission_required = 'testapp.access_own_book'
+    permission_required = 'testapp.list_books'
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+
+
+class InstrumentedView(PermissionRequiredMixin,
+                       SimpleResponseMixin,
+                       APIView):
+    permission_required = ('testapp.access_multiple_permissions_view_1',
+                           'testapp.access_multiple_permissions_view_2')
+    permission_timing_header = True
+
+
+class SnapshotPermissionView(PermissionRequiredMixin,
+                             SimpleResponseMixin,
+                             APIView):
+    permission_required = 'testapp.list_books'
+    permission_snapshot = True
+
+
+class RulesPermissionView(SimpleResponseMixin, APIView):
+    permission_classes = [RulesPermission]
+    permission_required = 'testapp.list_books'
+
+
+class RulesPermissionPropertyView(SimpleResponseMixin, APIView):
+    permission_classes = [RulesPermission]
+
+    @property
+    def permission_required(self):
+        return 'testapp.access_single_permission_view'
@@ -4,7 +4,10 @@ from rest_framework.decorators import list_route, detail_route
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ViewSet
 from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.decorators import (
+    permission_required as permission_required_decorator)
 from rest_framework_rules.mixins import PermissionRequiredMixin
+from rest_framework_rules.permissions import RulesPermission
 from rules.contrib.views import objectgetter
 from .models import Book
 from .serializers import BookSerializer
@@ -110,3 +113,68 @@ class MultiplePermissionsGenericViewSet(PermissionRequiredMixin,
     object_permission_required = ('testapp.access_single_permission_permission_object_1',
                                   'testapp.access_single_permission_permission_object_2')
     permission_required = 'testapp.access_single_permission_generic_viewset'
+
+
+class ScopedGenericViewSet(PermissionRequiredMixin,
+                           GenericViewSetMixin,
+                           GenericViewSet):
+    object_permission_required = 'testapp.access_own_book'
+    permission_required = 'testapp.list_books'
+    scope_queryset = True
+
+    def list(self, request):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, pk=None):
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
+
+class DecoratedGenericViewSet(PermissionRequiredMixin,
+                              GenericViewSetMixin,
+                              GenericViewSet):
+    object_permission_required = 'testapp.access_own_book'
+    permission_required = 'testapp.list_books'
+
+    # the class attribute shadows the decorator in the class body
+    @permission_required_decorator('testapp.access_own_book',
+                                   fn=objectgetter(Book),
+                                   pass_object=True)
+    def retrieve(self, request, pk=None):
+        book = self.get_object()
+        return Response({'pk': book.pk,
+                         'reused': book is self.permission_object})
+
+
+class RulesPermissionViewSet(GenericViewSetMixin, GenericViewSet):
+    object_permission_required = 'testapp.access_own_book'
+    permission_classes = [RulesPermission]
+    permission_required = 'testapp.list_books'
+
+    def retrieve(self, request, pk=None):
+        book = self.get_object()
+        return Response({'pk': book.pk})
+
+    @detail_route(methods=['post'],
+                  permission_required='testapp.access_single_permission_detail_route')
+    def publish(self, request, pk=None):
+        return Response({'the man': 'you'})
+
+
+class MappedPermissionsGenericViewSet(PermissionRequiredMixin,
+                                      GenericViewSetMixin,
+                                      GenericViewSet):
+    object_permission_required = {'retrieve': 'testapp.access_own_book'}
+    permission_required = {
+        'list': 'testapp.list_books',
+        'POST': 'testapp.access_single_permission_viewset',
+        '*': 'testapp.access_multiple_permissions_viewset_2',
+    }
+
+    def retrieve(self, request, pk=None):
+        book = self.get_object()
+        return Response({'pk': book.pk})
+
+    def create(self, request):
+        return Response({'the man': 'you'})
@@ -0,0 +1,242 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_save
+from django.test import TestCase
+from rest_framework_rules.cache import (DenialCache, DjangoDecisionCache,
+                                        LocMemDecisionCache,
+                                        MmapDecisionCache, PermissionCache,
+                                        fcntl, get_request_cache)
+from rest_framework_rules.evaluation import PermissionChecker
+from testapp.models import Book
+
+
+class CountingUser:
+
+    def __init__(self, decision=True):
+        self.calls = []
+        self.decision = decision
+
+    def has_perm(self, perm, obj=None):
+        self.calls.append((perm, obj))
+        return self.decision
+
+
+class PermissionCacheTests(TestCase):
+
+    """Tests the request-scoped permission cache
+    """
+
+    def test_decisions_are_memoized(self):
+        cache = PermissionCache()
+        user = CountingUser()
+        self.assertTrue(cache.has_perm(user, 'testapp.some_permission'))
+        self.assertTrue(cache.has_perm(user, 'testapp.some_permission'))
+        self.assertEqual(1, len(user.calls))
+
+    def test_denials_are_memoized(self):
+        cache = PermissionCache()
+        user = CountingUser(decision=False)
+        self.assertFalse(cache.has_perm(user, 'testapp.some_permission'))
+        self.assertFalse(cache.has_perm(user, 'testapp.some_permission'))
+        self.assertEqual(1, len(user.calls))
+
+    def test_model_instances_are_keyed_by_primary_key(self):
+        cache = PermissionCache()
+        user = CountingUser()
+        author = User.objects.create(username='dora')
+        book = Book.objects.create(title='Momo', author=author)
+        cache.has_perm(user, 'testapp.some_permission', book)
+        cache.has_perm(user, 'testapp.some_permission',
+                       Book.objects.get(pk=book.pk))
+        self.assertEqual(1, len(user.calls))
+
+    def test_permissions_and_objects_are_distinguished(self):
+        cache = PermissionCache()
+        user = CountingUser()
+        obj = object()
+        cache.has_perm(user, 'testapp.some_permission')
+        cache.has_perm(user, 'testapp.some_permission', obj)
+        cache.has_perm(user, 'testapp.other_permission', obj)
+        self.assertEqual(3, len(user.calls))
+
+    def test_request_cache_is_reused(self):
+        class Request:
+            pass
+
+        request = Request()
+        self.assertIs(get_request_cache(request), get_request_cache(request))
+
+
+class LocMemDecisionCacheTests(TestCase):
+
+    """Tests the in-process decision cache
+    """
+
+    def setUp(self):
+        self.user = User(pk=1, username='dora')
+
+    def test_decisions_are_stored(self):
+        cache = LocMemDecisionCache()
+        self.assertIsNone(cache.get(self.user, 'testapp.some_permission'))
+        cache.set(self.user, 'testapp.some_permission', False)
+        self.assertIs(False, cache.get(self.user, 'testapp.some_permission'))
+        self.assertIsNone(cache.get(User(pk=2), 'testapp.some_permission'))
+
+    def test_least_recently_used_decisions_are_discarded(self):
+        cache = LocMemDecisionCache(max_size=2)
+        cache.set(self.user, 'testapp.first_permission', True)
+        cache.set(self.user, 'testapp.second_permission', True)
+        cache.get(self.user, 'testapp.first_permission')
+        cache.set(self.user, 'testapp.third_permission', True)
+        self.assertTrue(cache.get(self.user, 'testapp.first_permission'))
+        self.assertIsNone(cache.get(self.user, 'testapp.second_permission'))
+
+    def test_expired_decisions_are_discarded(self):
+        cache = LocMemDecisionCache(timeout=-1)
+        cache.set(self.user, 'testapp.some_permission', True)
+        self.assertIsNone(cache.get(self.user, 'testapp.some_permission'))
+
+    def test_signals_invalidate_the_decisions(self):
+        cache = LocMemDecisionCache()
+        cache.invalidate_on(post_save, sender=Book)
+        self.addCleanup(post_save.disconnect, cache.receive_signal, sender=Book)
+        cache.set(self.user, 'testapp.some_permission', True)
+        author = User.objects.create(username='emil')
+        Book.objects.create(title='Emil und die Detektive', author=author)
+        self.assertIsNone(cache.get(self.user, 'testapp.some_permission'))
+
+
+class DenialCacheTests(TestCase):
+
+    def test_denials_only_are_stored(self):
+        cache = DenialCache()
+        user = User(pk=1)
+        cache.set(user, 'testapp.allowed_permission', True)
+        cache.set(user, 'testapp.denied_permission', False)
+        self.assertIsNone(cache.get(user, 'testapp.allowed_permission'))
+        self.assertIs(False, cache.get(user, 'testapp.denied_permission'))
+
+
+@skipIf(fcntl is None, 'requires fcntl')
+class MmapDecisionCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'decisions')
+
+    def get_cache(self, **kwargs):
+        kwargs.setdefault('secret', 'the secret')
+        cache = MmapDecisionCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_decisions_are_shared_through_the_file(self):
+        user = User(pk=1)
+        self.get_cache(slots=1024).set(user, 'testapp.some_permission', True)
+        self.get_cache(slots=1024).set(user, 'testapp.other_permission', False)
+        cache = self.get_cache(slots=1024)
+        self.assertTrue(cache.get(user, 'testapp.some_permission'))
+        self.assertIs(False, cache.get(user, 'testapp.other_permission'))
+        self.assertIsNone(cache.get(User(pk=2), 'testapp.some_permission'))
+        self.assertEqual(cache.size, os.path.getsize(self.path))
+
+    def test_invalidation_discards_the_decisions(self):
+        user = User(pk=1)
+        cache = self.get_cache(slots=16)
+        cache.set(user, 'testapp.some_permission', True)
+        self.get_cache(slots=16).invalidate()
+        self.assertIsNone(cache.get(user, 'testapp.some_permission'))
+
+    def test_expired_decisions_are_discarded(self):
+        user = User(pk=1)
+        cache = self.get_cache(slots=16, timeout=-1)
+        cache.set(user, 'testapp.some_permission', True)
+        self.assertIsNone(cache.get(user, 'testapp.some_permission'))
+
+    def test_decisions_are_keyed_with_the_secret(self):
+        user = User(pk=1)
+        self.get_cache(slots=16, secret='one').set(
+            user, 'testapp.some_permission', True)
+        self.assertIsNone(self.get_cache(slots=16, secret='other').get(
+            user, 'testapp.some_permission'))
+
+    def test_symbolic_links_are_refused(self):
+        target = self.path + '.target'
+        self.get_cache(slots=16).set(User(pk=1), 'testapp.permission', True)
+        os.rename(self.path, target)
+        os.symlink(target, self.path)
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_cache(slots=16).get(User(pk=1), 'testapp.permission')
+
+    def test_files_accessible_to_others_are_refused(self):
+        with open(self.path, 'wb'):
+            pass
+        os.chmod(self.path, 0o666)
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_cache(slots=16).get(User(pk=1), 'testapp.permission')
+
+
+class DjangoDecisionCacheTests(TestCase):
+
+    """Tests the decision cache using Django's cache framework
+    """
+
+    def test_invalidation_discards_the_decisions(self):
+        cache = DjangoDecisionCache(key_prefix='test_invalidation')
+        user = User(pk=1, username='dora')
+        cache.set(user, 'testapp.some_permission', True)
+        self.assertTrue(cache.get(user, 'testapp.some_permission'))
+        cache.invalidate()
+        self.assertIsNone(cache.get(user, 'testapp.some_permission'))
+
+
+class PermissionCheckerTests(TestCase):
+
+    """Tests the caches consulted by the permission checker
+    """
+
+    def get_request(self, user):
+        return type('Request', (), {'user': user})()
+
+    def test_decision_cache_is_shared_across_requests(self):
+        user = CountingUser()
+        user.pk = 1
+        decision_cache = LocMemDecisionCache()
+        for _ in range(2):
+            checker = PermissionChecker(self.get_request(user),
+                                        decision_cache=decision_cache)
+            self.assertTrue(checker.has_perm('testapp.some_permission'))
+        self.assertEqual(1, len(user.calls))
+
+    def test_decision_cache_ignores_object_permissions(self):
+        user = CountingUser()
+        user.pk = 1
+        decision_cache = LocMemDecisionCache()
+        for _ in range(2):
+            checker = PermissionChecker(self.get_request(user),
+                                        decision_cache=decision_cache)
+            checker.has_perm('testapp.some_permission', object())
+        self.assertEqual(2, len(user.calls))
+
+    def test_cached_denials_reject_before_evaluating(self):
+        user = CountingUser(decision=False)
+        user.pk = 1
+        denial_cache = DenialCache()
+        perms = ['testapp.first_permission', 'testapp.second_permission']
+        checker = PermissionChecker(self.get_request(user),
+                                    denial_cache=denial_cache)
+        missing = checker.get_missing_permissions(perms)
+        self.assertEqual(1, len(user.calls))
+
+        checker = PermissionChecker(self.get_request(user),
+                                    denial_cache=denial_cache)
+        self.assertEqual(missing, checker.get_missing_permissions(perms))
+        self.assertEqual(1, len(user.calls))
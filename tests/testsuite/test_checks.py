@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from rest_framework.views import APIView
+from rest_framework_rules.checks import check_permissions
+from rest_framework_rules.decorators import permission_required
+from rest_framework_rules.mixins import PermissionRequiredMixin
+from testapp import views, viewsets
+
+
+class PermissionNormalizationTests(TestCase):
+
+    def test_as_view_normalizes_permissions(self):
+        class SinglePermissionView(PermissionRequiredMixin, APIView):
+            object_permission_required = ['testapp.access_single_permission_object']
+            permission_required = 'testapp.access_single_permission_view'
+
+        SinglePermissionView.as_view()
+        self.assertEqual(('testapp.access_single_permission_view', ),
+                         SinglePermissionView.permission_required)
+        self.assertEqual(('testapp.access_single_permission_object', ),
+                         SinglePermissionView.object_permission_required)
+
+    def test_as_view_normalizes_initkwargs(self):
+        view = views.SinglePermissionView.as_view(
+            permission_required='testapp.access_single_permission_view')
+        self.assertEqual(('testapp.access_single_permission_view', ),
+                         view.initkwargs['permission_required'])
+
+    def test_as_view_raises_on_invalid_permissions(self):
+        class InvalidPermissionView(PermissionRequiredMixin, APIView):
+            permission_required = 42
+
+        with self.assertRaises(ImproperlyConfigured):
+            InvalidPermissionView.as_view()
+
+    def test_decorator_raises_on_invalid_permissions(self):
+        with self.assertRaises(ImproperlyConfigured):
+            permission_required(('testapp.access_single_permission_method', ))
+
+
+class CheckPermissionsTests(TestCase):
+
+    def test_views_without_permissions_are_errors(self):
+        errors = [error.obj for error in check_permissions()
+                  if error.id == 'rest_framework_rules.E001']
+        self.assertEqual({views.ImproperlyConfiguredAPIView,
+                          viewsets.ImproperlyConfiguredViewSet},
+                         set(errors))
+
+    def test_unknown_permissions_are_warnings(self):
+        warnings = [error for error in check_permissions()
+                    if error.id == 'rest_framework_rules.W001']
+        self.assertEqual(2, len(warnings))
+        self.assertTrue(all(warning.obj is viewsets.MultiplePermissionsGenericViewSet
+                            for warning in warnings))
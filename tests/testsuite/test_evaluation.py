@@ -0,0 +1,239 @@
+from __future__ import absolute_import
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import rules
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_rules.evaluation import (PermissionChecker,
+                                             aget_missing_permissions,
+                                             get_cost, get_missing_permissions,
+                                             get_missing_permissions_threaded,
+                                             record_cost)
+from rest_framework_rules.predicates import cost
+from testapp import views
+
+
+class RecordingChecker:
+
+    def __init__(self, denied=()):
+        self.denied = denied
+        self.checked = []
+
+    def __call__(self, perm, obj=None):
+        self.checked.append(perm)
+        return perm not in self.denied
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class MissingPermissionsTests(TestCase):
+
+    """Tests the evaluation of the required permissions
+    """
+
+    def setUp(self):
+        @cost(1)
+        @rules.predicate
+        def is_cheap(user):
+            return True
+
+        @cost(50)
+        @rules.predicate
+        def is_expensive(user):
+            return True
+
+        rules.add_perm('testapp.test_cheap', is_cheap)
+        rules.add_perm('testapp.test_expensive', is_expensive)
+        rules.add_perm('testapp.test_combined', is_cheap & is_expensive)
+        self.addCleanup(rules.remove_perm, 'testapp.test_cheap')
+        self.addCleanup(rules.remove_perm, 'testapp.test_expensive')
+        self.addCleanup(rules.remove_perm, 'testapp.test_combined')
+
+    def test_declared_costs_are_summed(self):
+        self.assertEqual(1, get_cost('testapp.test_cheap'))
+        self.assertEqual(51, get_cost('testapp.test_combined'))
+
+    def test_measured_cost_is_used_without_declared_cost(self):
+        record_cost('testapp.test_measured', 10)
+        record_cost('testapp.test_measured', 20)
+        self.assertEqual(12, get_cost('testapp.test_measured'))
+
+    def test_only_evaluations_are_measured(self):
+        rules.add_perm('testapp.test_cached', rules.predicate(lambda user: True))
+        self.addCleanup(rules.remove_perm, 'testapp.test_cached')
+        request = type('Request', (), {'user': User.objects.get(username='anton')})()
+        checker = PermissionChecker(request, cache=True)
+        with mock.patch('rest_framework_rules.evaluation.record_cost') as record:
+            checker.get_missing_permissions(('testapp.test_cached', ))
+            checker.get_missing_permissions(('testapp.test_cached', ))
+        self.assertEqual(1, record.call_count)
+
+    def test_cheap_permissions_are_evaluated_first(self):
+        checker = RecordingChecker()
+        get_missing_permissions(checker, ('testapp.test_expensive',
+                                          'testapp.test_cheap'))
+        self.assertEqual(['testapp.test_cheap', 'testapp.test_expensive'],
+                         checker.checked)
+
+    def test_evaluation_stops_at_first_missing_permission(self):
+        checker = RecordingChecker(denied=('testapp.test_cheap',
+                                           'testapp.test_expensive'))
+        missing = get_missing_permissions(checker, ('testapp.test_expensive',
+                                                    'testapp.test_cheap'))
+        self.assertEqual(['testapp.test_cheap'], missing)
+        self.assertEqual(['testapp.test_cheap'], checker.checked)
+
+    def test_all_missing_permissions_are_reported_in_given_order(self):
+        checker = RecordingChecker(denied=('testapp.test_cheap',
+                                           'testapp.test_expensive'))
+        missing = get_missing_permissions(checker, ('testapp.test_expensive',
+                                                    'testapp.test_cheap'),
+                                          report_all=True)
+        self.assertEqual(['testapp.test_expensive', 'testapp.test_cheap'],
+                         missing)
+
+
+class AsyncMissingPermissionsTests(TestCase):
+
+    """Tests the asynchronous evaluation of the required permissions
+    """
+
+    def test_permissions_are_evaluated_concurrently(self):
+        running = []
+
+        async def ahas_perm(perm, obj=None):
+            running.append(perm)
+            await asyncio.sleep(0)
+            # all evaluations started before the first one completes
+            self.assertEqual(2, len(running))
+            return True
+
+        self.assertEqual([], run(aget_missing_permissions(
+            ahas_perm, ('testapp.test_first', 'testapp.test_second'))))
+
+    def test_pending_evaluations_are_cancelled_at_first_missing_permission(self):
+        cancelled = []
+
+        async def ahas_perm(perm, obj=None):
+            if perm == 'testapp.test_denied':
+                return False
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(perm)
+                raise
+            return True
+
+        missing = run(aget_missing_permissions(
+            ahas_perm, ('testapp.test_slow', 'testapp.test_denied')))
+        self.assertEqual(['testapp.test_denied'], missing)
+        self.assertEqual(['testapp.test_slow'], cancelled)
+
+    def test_all_missing_permissions_are_reported_in_given_order(self):
+        async def ahas_perm(perm, obj=None):
+            return False
+
+        missing = run(aget_missing_permissions(
+            ahas_perm, ('testapp.test_second', 'testapp.test_first'),
+            report_all=True))
+        self.assertEqual(['testapp.test_second', 'testapp.test_first'], missing)
+
+
+class ThreadedMissingPermissionsTests(TestCase):
+
+    """Tests the evaluation of the required permissions in threads
+    """
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.released = threading.Event()
+        self.addCleanup(self.released.set)
+
+    def has_perm(self, perm, obj=None):
+        if perm.endswith('_blocked'):
+            self.released.wait(10)
+        return not perm.endswith(('_denied', '_blocked'))
+
+    def test_first_missing_permission_in_given_order_is_reported(self):
+        for _ in range(10):
+            missing = get_missing_permissions_threaded(
+                self.has_perm, ('testapp.test_granted', 'testapp.test_1_denied',
+                                'testapp.test_2_denied'), self.executor)
+            self.assertEqual(['testapp.test_1_denied'], missing)
+
+    def test_all_missing_permissions_are_reported_in_given_order(self):
+        missing = get_missing_permissions_threaded(
+            self.has_perm, ('testapp.test_2_denied', 'testapp.test_granted',
+                            'testapp.test_1_denied'),
+            self.executor, report_all=True)
+        self.assertEqual(['testapp.test_2_denied', 'testapp.test_1_denied'],
+                         missing)
+
+    def test_evaluation_does_not_wait_for_later_permissions(self):
+        missing = get_missing_permissions_threaded(
+            self.has_perm, ('testapp.test_denied', 'testapp.test_blocked'),
+            self.executor)
+        self.assertEqual(['testapp.test_denied'], missing)
+        self.assertFalse(self.released.is_set())
+
+    def test_timed_out_permissions_are_missing(self):
+        with self.assertLogs('rest_framework_rules.evaluation', 'WARNING'):
+            missing = get_missing_permissions_threaded(
+                self.has_perm, ('testapp.test_granted', 'testapp.test_blocked'),
+                self.executor, timeout=0.05)
+        self.assertEqual(['testapp.test_blocked'], missing)
+
+    def test_connections_of_threads_are_closed(self):
+        with mock.patch('rest_framework_rules.evaluation.'
+                        'close_old_connections') as close_old_connections:
+            get_missing_permissions_threaded(
+                self.has_perm, ('testapp.test_granted', 'testapp.test_other'),
+                self.executor)
+        self.assertEqual(2, close_old_connections.call_count)
+
+    def get_view_response(self):
+        view = views.InstrumentedView.as_view(permission_executor=self.executor,
+                                              permission_timeout=5)
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=User.objects.get(username='beatrix'))
+        return view(request)
+
+    def test_view_evaluates_permissions_in_threads(self):
+        threads = []
+
+        def has_perm(user, perm, obj=None):
+            threads.append(threading.current_thread())
+            return not perm.endswith('_1')
+
+        # the backends' queries would not see the test's transaction
+        with mock.patch.object(User, 'has_perm', has_perm), \
+                mock.patch('rest_framework_rules.evaluation.in_atomic_block',
+                           return_value=False):
+            response = self.get_view_response()
+        self.assertEqual(403, response.status_code)
+        self.assertEqual(
+            'MISSING: testapp.access_multiple_permissions_view_1',
+            response.data['detail'])
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_view_evaluates_permissions_sequentially_in_transactions(self):
+        with mock.patch.object(self.executor, 'submit') as submit:
+            response = self.get_view_response()
+        self.assertFalse(submit.called)
+        self.assertEqual(403, response.status_code)
+        self.assertEqual(
+            'MISSING: testapp.access_multiple_permissions_view_1',
+            response.data['detail'])
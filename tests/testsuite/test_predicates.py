@@ -0,0 +1,389 @@
+from __future__ import absolute_import
+
+import asyncio
+import itertools
+
+import rules
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.test import TestCase
+from rest_framework_rules.cache import PermissionCache
+from rest_framework_rules.evaluation import PermissionChecker
+from rest_framework_rules.filters import get_permitted_queryset
+from rest_framework_rules.predicates import constant as declare_constant
+from rest_framework_rules.predicates import (aevaluate, ahas_perm, batch,
+                                             compile_q, decompose,
+                                             evaluate_many, filter_objects,
+                                             fold, get_constant_decision,
+                                             get_user_class, has_perm_many,
+                                             has_perms_many, is_async,
+                                             permissions_to_q, queryset_filter)
+from testapp.models import Book
+from testapp.rules import is_author
+
+
+def constant(value):
+    return rules.predicate(lambda user, target: value,
+                           name='constant_{}'.format(value))
+
+
+class Target:
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+
+@rules.predicate
+def is_allowed(user, target):
+    return target.allowed
+
+
+class PredicateEvaluationTests(TestCase):
+
+    """Tests the evaluation of predicates on many objects at once
+    """
+
+    def test_decompose_returns_the_operands(self):
+        left, right = constant(True), constant(False)
+        self.assertEqual(('AND', (left, right)), decompose(left & right))
+        self.assertEqual(('OR', (left, right)), decompose(left | right))
+        self.assertEqual(('XOR', (left, right)), decompose(left ^ right))
+        self.assertEqual(('INVERT', (left, )), decompose(~left))
+        self.assertIsNone(decompose(left))
+
+    def test_results_match_rules(self):
+        values = (True, False, None)
+        operations = (lambda a, b: a & b,
+                      lambda a, b: a | b,
+                      lambda a, b: a ^ b,
+                      lambda a, b: ~a & b,
+                      lambda a, b: ~(a | b))
+        for (left, right), operation in itertools.product(
+                itertools.product(values, values), operations):
+            predicate = operation(constant(left), constant(right))
+            expected = predicate.test(None, None)
+            results = evaluate_many(predicate, None, [None])
+            self.assertEqual(expected, bool(results[0]), predicate.name)
+
+    def test_batch_implementation_is_used(self):
+        @rules.predicate
+        def is_batched(user, target):
+            raise AssertionError('evaluated per object')
+
+        calls = []
+
+        @batch(is_batched)
+        def are_batched(user, targets):
+            calls.append(targets)
+            return [target.allowed for target in targets]
+
+        targets = [Target(True), Target(False), Target(True)]
+        self.assertEqual([True, False, True],
+                         evaluate_many(is_batched, None, targets))
+        self.assertEqual(1, len(calls))
+
+    def test_predicates_without_target_are_evaluated_once(self):
+        calls = []
+
+        @rules.predicate
+        def is_counted(user):
+            calls.append(user)
+            return True
+
+        self.assertEqual([True, True, True],
+                         evaluate_many(is_counted, None, [1, 2, 3]))
+        self.assertEqual(1, len(calls))
+
+    def test_right_operand_is_evaluated_on_remaining_objects(self):
+        evaluated = []
+
+        @rules.predicate
+        def is_recorded(user, target):
+            evaluated.append(target)
+            return True
+
+        targets = [Target(True), Target(False)]
+        evaluate_many(is_allowed & is_recorded, None, targets)
+        self.assertEqual([targets[0]], evaluated)
+
+    def test_filter_objects_keeps_permitted_objects(self):
+        rules.add_perm('testapp.test_filter_objects', is_allowed)
+        self.addCleanup(rules.remove_perm, 'testapp.test_filter_objects')
+
+        class User:
+            is_active = True
+            is_anonymous = False
+            is_superuser = False
+
+        targets = [Target(True), Target(False), Target(True)]
+        self.assertEqual([targets[0], targets[2]],
+                         filter_objects(User(), ['testapp.test_filter_objects'],
+                                        targets))
+
+    def test_active_superusers_have_all_permissions(self):
+        class User:
+            is_active = True
+            is_superuser = True
+
+        self.assertEqual([True, True],
+                         has_perm_many(User(), 'testapp.unknown', [1, 2]))
+
+
+class DecisionMatrixTests(TestCase):
+
+    """Tests the evaluation of many permissions on many objects at once
+    """
+    def setUp(self):
+        rules.add_perm('testapp.test_matrix_allowed', is_allowed)
+        rules.add_perm('testapp.test_matrix_denied', constant(False))
+        self.addCleanup(rules.remove_perm, 'testapp.test_matrix_allowed')
+        self.addCleanup(rules.remove_perm, 'testapp.test_matrix_denied')
+        self.perms = ['testapp.test_matrix_allowed', 'testapp.test_matrix_denied']
+        self.targets = [Target(True), Target(False)]
+
+    def test_matrix_holds_the_decisions(self):
+        matrix = has_perms_many(User(), self.perms, self.targets)
+        self.assertEqual([True, False], matrix.get_row('testapp.test_matrix_allowed'))
+        self.assertEqual([False, False], matrix.get_row('testapp.test_matrix_denied'))
+        self.assertEqual(['testapp.test_matrix_denied'], matrix.get_missing_permissions(0))
+        self.assertEqual([], matrix.get_permitted_objects())
+
+    def test_denied_objects_are_skipped_on_demand(self):
+        evaluated = []
+
+        @rules.predicate
+        def is_recorded(user, target):
+            evaluated.append(target)
+            return True
+
+        rules.add_perm('testapp.test_matrix_recorded', is_recorded)
+        self.addCleanup(rules.remove_perm, 'testapp.test_matrix_recorded')
+        matrix = has_perms_many(User(), ['testapp.test_matrix_allowed',
+                                         'testapp.test_matrix_recorded'],
+                                self.targets, stop_on_denial=True)
+        self.assertEqual([self.targets[0]], evaluated)
+        self.assertEqual([self.targets[0]], matrix.get_permitted_objects())
+
+    def test_cached_decisions_are_reused(self):
+        cache = PermissionCache()
+        cache.set('testapp.test_matrix_denied', self.targets[0], True)
+        matrix = has_perms_many(User(), self.perms, self.targets, cache=cache)
+        self.assertEqual([True, False], matrix.get_row('testapp.test_matrix_denied'))
+        self.assertFalse(cache.get('testapp.test_matrix_denied', self.targets[1]))
+
+
+class BackendPermissionTests(TestCase):
+
+    """Tests that the permissions granted by other authentication backends
+    are not denied by the bulk checks
+    """
+    def setUp(self):
+        rules.add_perm('testapp.change_book', rules.is_staff)
+        self.addCleanup(rules.remove_perm, 'testapp.change_book')
+        self.user = User.objects.create_user('carl')
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='change_book'))
+
+    def test_backend_permissions_are_granted(self):
+        self.assertTrue(self.user.has_perm('testapp.change_book'))
+        self.assertEqual([True],
+                         has_perm_many(self.user, 'testapp.change_book', [None]))
+
+    def test_backend_permissions_are_cached_as_granted(self):
+        cache = PermissionCache()
+        matrix = has_perms_many(self.user, ['testapp.change_book'], [None],
+                                cache=cache)
+        self.assertEqual([True], matrix.get_row('testapp.change_book'))
+        self.assertTrue(cache.get('testapp.change_book', None))
+
+    def test_rules_denials_are_kept(self):
+        self.assertEqual([False],
+                         has_perm_many(User.objects.create_user('dora'),
+                                       'testapp.change_book', [None]))
+
+
+class ConstantFoldingTests(TestCase):
+
+    """Tests the decisions known from the class of the user
+    """
+
+    def setUp(self):
+        self.evaluated = []
+
+        @rules.predicate
+        def is_a_climber(user):
+            self.evaluated.append('is_a_climber')
+            return True
+
+        @rules.predicate
+        def is_a_routesetter(user):
+            self.evaluated.append('is_a_routesetter')
+            return True
+
+        declare_constant(anonymous=False)(is_a_climber)
+        declare_constant(anonymous=False, staff=True)(is_a_routesetter)
+        self.predicate = is_a_climber | is_a_routesetter & is_author
+        rules.add_perm('testapp.test_folded', self.predicate)
+        self.addCleanup(rules.remove_perm, 'testapp.test_folded')
+        self.staff = User(username='staff', is_staff=True)
+
+    def test_user_classes(self):
+        self.assertEqual('anonymous', get_user_class(AnonymousUser()))
+        self.assertEqual('staff', get_user_class(self.staff))
+        self.assertEqual('superuser',
+                         get_user_class(User(is_staff=True, is_superuser=True)))
+        self.assertIsNone(get_user_class(User()))
+
+    def test_trees_are_folded(self):
+        self.assertFalse(fold(self.predicate, 'anonymous'))
+        self.assertIsNone(fold(self.predicate, 'staff'))
+        self.assertIsNone(fold(self.predicate, None))
+        self.assertTrue(fold(~is_author | rules.is_staff, 'staff'))
+        self.assertTrue(fold(~rules.is_authenticated, 'anonymous'))
+
+    def test_anonymous_users_are_denied_without_evaluation(self):
+        checker = PermissionChecker(type('Request', (), {'user': AnonymousUser()})())
+        self.assertEqual(['testapp.test_folded'],
+                         checker.get_missing_permissions(['testapp.test_folded']))
+        self.assertEqual([False], has_perm_many(AnonymousUser(), 'testapp.test_folded',
+                                                [Target(True)]))
+        self.assertEqual([], self.evaluated)
+
+    def test_staff_denials_are_not_folded(self):
+        self.assertTrue(get_constant_decision(self.staff, 'testapp.access_own_book_or_staff'))
+        self.assertIsNone(get_constant_decision(self.staff, 'testapp.test_folded'))
+        rules.add_perm('testapp.test_folded_denial', rules.is_superuser)
+        self.addCleanup(rules.remove_perm, 'testapp.test_folded_denial')
+        self.assertIsNone(get_constant_decision(self.staff, 'testapp.test_folded_denial'))
+
+    def test_registering_again_folds_again(self):
+        self.assertFalse(get_constant_decision(AnonymousUser(), 'testapp.test_folded'))
+        rules.remove_perm('testapp.test_folded')
+        rules.add_perm('testapp.test_folded', rules.always_allow)
+        self.assertTrue(get_constant_decision(AnonymousUser(), 'testapp.test_folded'))
+
+    def test_unknown_user_classes_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            declare_constant(routesetter=True)
+
+
+class PredicateCompilationTests(TestCase):
+
+    """Tests the compilation of permissions into queryset filters
+    """
+
+    def setUp(self):
+        self.dora = User.objects.create_user('dora')
+        self.staff = User.objects.create_user('emil', is_staff=True)
+        self.book = Book.objects.create(title='Momo', author=self.dora)
+
+    def get_permitted_books(self, user, perm):
+        return set(get_permitted_queryset(user, [perm], Book.objects.all()))
+
+    def test_compiled_permission_selects_permitted_objects(self):
+        self.assertEqual({self.book},
+                         self.get_permitted_books(self.dora, 'testapp.access_own_book'))
+
+    def test_compiled_permission_folds_predicates_without_target(self):
+        self.assertIsNotNone(permissions_to_q(self.dora, ['testapp.access_own_book_or_staff']))
+        self.assertEqual(set(Book.objects.all()),
+                         self.get_permitted_books(self.staff, 'testapp.access_own_book_or_staff'))
+
+    def test_inverted_compiled_permission(self):
+        rules.add_perm('testapp.test_not_own_book', ~is_author)
+        self.addCleanup(rules.remove_perm, 'testapp.test_not_own_book')
+        self.assertEqual(set(Book.objects.exclude(author=self.dora)),
+                         self.get_permitted_books(self.dora, 'testapp.test_not_own_book'))
+
+    def test_uncompilable_permission_is_evaluated_on_objects(self):
+        rules.add_perm('testapp.test_uncompilable', is_allowed | is_author)
+        self.addCleanup(rules.remove_perm, 'testapp.test_uncompilable')
+        self.assertIsNone(compile_q(rules.permissions.permissions['testapp.test_uncompilable'],
+                                    self.dora))
+
+    def test_anonymous_users_get_declared_results(self):
+        self.assertIs(False, permissions_to_q(AnonymousUser(), ['testapp.access_own_book']))
+        self.assertEqual(set(), self.get_permitted_books(AnonymousUser(), 'testapp.access_own_book'))
+        self.assertEqual(set(), self.get_permitted_books(AnonymousUser(), 'testapp.access_own_book_or_staff'))
+
+    def assertQEqual(self, expected, q):
+        # Q objects are not comparable before django 2.0
+        self.assertEqual(str(expected), str(q))
+
+    def test_anonymous_users_are_passed_to_filters(self):
+        @rules.predicate
+        def is_titled_momo(user, target):
+            return target.title == 'Momo'
+
+        queryset_filter(is_titled_momo)(lambda user: Q(title='Momo'))
+        rules.add_perm('testapp.test_momo', is_titled_momo)
+        self.addCleanup(rules.remove_perm, 'testapp.test_momo')
+        self.assertQEqual(Q(title='Momo'),
+                          permissions_to_q(AnonymousUser(), ['testapp.test_momo']))
+        self.assertEqual({self.book},
+                         self.get_permitted_books(AnonymousUser(), 'testapp.test_momo'))
+        self.assertQEqual(Q(title='Momo'),
+                          permissions_to_q(self.dora, ['testapp.test_momo']))
+
+    def test_users_are_evaluated_if_filters_cannot_compile(self):
+        @rules.predicate
+        def is_titled_by_user(user, target):
+            return target.title == getattr(user, 'username', None)
+
+        @queryset_filter(is_titled_by_user)
+        def titled_by_user(user):
+            if not user.is_authenticated:
+                return None
+            return Q(title=user.username)
+
+        rules.add_perm('testapp.test_titled', is_titled_by_user)
+        self.addCleanup(rules.remove_perm, 'testapp.test_titled')
+        self.assertIsNone(permissions_to_q(AnonymousUser(), ['testapp.test_titled']))
+        with self.assertLogs('rest_framework_rules.filters', 'WARNING'):
+            self.assertEqual(set(), self.get_permitted_books(AnonymousUser(),
+                                                             'testapp.test_titled'))
+
+    def test_constant_permissions_compile_to_booleans(self):
+        self.assertIs(True, compile_q(rules.is_authenticated, self.dora))
+        self.assertIs(False, compile_q(~rules.is_authenticated, self.dora))
+
+
+class AsyncPredicateEvaluationTests(TestCase):
+
+    """Tests the evaluation of predicates which are coroutine functions
+    """
+
+    def run_coroutine(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_coroutine_predicates_are_awaited(self):
+        @rules.predicate
+        async def is_allowed_async(user, target):
+            await asyncio.sleep(0)
+            return target.allowed
+
+        predicate = is_allowed_async & ~is_allowed_async
+        self.assertTrue(is_async(predicate))
+        self.assertFalse(is_async(is_allowed))
+        self.assertTrue(self.run_coroutine(
+            aevaluate(is_allowed_async, None, Target(True))))
+        self.assertFalse(self.run_coroutine(
+            aevaluate(predicate, None, Target(True))))
+
+    def test_async_permissions_are_evaluated(self):
+        @rules.predicate
+        async def is_allowed_async(user, target):
+            return target.allowed
+
+        rules.add_perm('testapp.test_async', is_allowed_async)
+        self.addCleanup(rules.remove_perm, 'testapp.test_async')
+        user = User(username='dora')
+        self.assertTrue(self.run_coroutine(
+            ahas_perm(user, 'testapp.test_async', Target(True))))
+        self.assertFalse(self.run_coroutine(
+            ahas_perm(user, 'testapp.test_async', Target(False))))
@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import get_resolver
+from rest_framework_rules.management.commands import profile_permissions
+from rest_framework_rules.profiling import get_permission_plan, get_routes
+
+
+class PermissionPlanTests(TestCase):
+
+    """Tests the plans of the permissions checked by the routed views
+    """
+
+    def setUp(self):
+        self.plan = {
+            (endpoint.view_class.__name__, endpoint.method, endpoint.action):
+                endpoint
+            for route, view in get_routes(get_resolver().url_patterns)
+            for endpoint in get_permission_plan(route, view)
+        }
+
+    def test_view_attributes_are_planned(self):
+        endpoint = self.plan[('SinglePermissionView', 'GET', None)]
+        self.assertEqual('single_permission_view/', endpoint.route)
+        self.assertEqual(('testapp.access_single_permission_view', ),
+                         endpoint.permissions)
+        self.assertEqual((), endpoint.object_permissions)
+
+    def test_object_permissions_are_planned_for_detail_routes(self):
+        endpoint = self.plan[('SinglePermissionGenericView', 'GET', None)]
+        self.assertEqual(('testapp.access_single_permission_object', ),
+                         endpoint.object_permissions)
+
+    def test_routes_and_decorated_methods_are_planned(self):
+        self.assertEqual(
+            ('testapp.access_single_permission_detail_route', ),
+            self.plan[('DecoratedViewSetWithCustomRoutes', 'GET',
+                       'single_permission_list_route')].permissions)
+        self.assertEqual(
+            ('testapp.access_single_permission_method', ),
+            self.plan[('DecoratedViewSet', 'GET', 'list')].permissions)
+
+    def test_decorated_objects_are_planned(self):
+        endpoint = self.plan[('DecoratedViewSet', 'GET', 'retrieve')]
+        self.assertEqual(('testapp.access_single_object_permission_method', ),
+                         endpoint.object_permissions)
+        self.assertIsNotNone(endpoint.object_fn)
+        self.assertIsNone(
+            self.plan[('DecoratedViewSet', 'GET', 'list')].object_fn)
+
+    def test_views_without_permissions_are_not_planned(self):
+        self.assertNotIn(('ImproperlyConfiguredAPIView', 'GET', None),
+                         self.plan)
+
+
+class ProfilePermissionsCommandTests(TestCase):
+
+    """Tests the profile_permissions management command
+    """
+
+    def test_command_reports_endpoints_and_predicates(self):
+        out = StringIO()
+        call_command(profile_permissions.Command(), user=['anton', 'beatrix'],
+                     iterations=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('single_permission_view/', output)
+        self.assertIn('Most expensive predicates:', output)
+        self.assertIn('is_anton', output)
+
+    def get_line(self, output, route, method):
+        lines = [line for line in output.splitlines()
+                 if line.split()[:2] == [route, method]]
+        self.assertEqual(1, len(lines))
+        return lines[0]
+
+    def test_decorated_objects_are_resolved(self):
+        out = StringIO()
+        call_command(profile_permissions.Command(), user=['anton'],
+                     iterations=1, stdout=out)
+        line = self.get_line(out.getvalue(),
+                             r'decorated_generic_viewset/(?P<pk>[^/.]+)/',
+                             'GET')
+        self.assertIn('queries', line)
+        self.assertNotIn('no objects', line)
+
+    def test_endpoints_without_objects_are_not_profiled(self):
+        out = StringIO()
+        call_command(profile_permissions.Command(), user=['anton'],
+                     iterations=1, stdout=out)
+        line = self.get_line(out.getvalue(),
+                             r'decorated_viewset/(?P<pk>[^/.]+)/', 'GET')
+        self.assertIn('not profiled', line)
+        self.assertIn('testapp.access_single_object_permission_method', line)
+        self.assertNotIn('0.000ms', line)
@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from rest_framework_rules import serializers
+from rest_framework_rules.cache import get_request_cache
+from testapp.models import Book
+from testapp.serializers import AuthorSerializer, GuardedBookSerializer
+
+
+class FieldPermissionsMixinTests(TestCase):
+
+    def get_request(self, username):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(username=username)
+        return request
+
+    def test_fields_are_omitted_without_permission(self):
+        request = self.get_request('anton')
+        data = GuardedBookSerializer(Book.objects.order_by('pk'), many=True,
+                                     context={'request': request}).data
+        self.assertEqual(["anton's book", None, None],
+                         [book.get('title') for book in data])
+
+    def test_list_permissions_are_evaluated_at_once(self):
+        request = self.get_request('beatrix')
+        with mock.patch.object(serializers, 'has_perms_many',
+                               wraps=serializers.has_perms_many) as has_perms_many:
+            GuardedBookSerializer(Book.objects.all(), many=True,
+                                  context={'request': request}).data
+        self.assertEqual(1, has_perms_many.call_count)
+        self.assertEqual(3, len(get_request_cache(request)._decisions))
+
+    def test_nested_list_permissions_are_evaluated_at_once(self):
+        request = self.get_request('anton')
+        authors = User.objects.filter(username__in=('anton', 'beatrix'))
+        with mock.patch.object(serializers, 'has_perms_many',
+                               wraps=serializers.has_perms_many) as has_perms_many:
+            data = AuthorSerializer(authors.order_by('username'), many=True,
+                                    context={'request': request}).data
+        # once per nested list
+        self.assertEqual(2, has_perms_many.call_count)
+        self.assertEqual([["anton's book"], [None]],
+                         [[book.get('title') for book in author['books']]
+                          for author in data])
+
+    def test_meta_is_not_modified(self):
+        serializer = GuardedBookSerializer(Book.objects.all(), many=True,
+                                           allow_empty=False)
+        self.assertIsInstance(serializer,
+                              serializers.FieldPermissionsListSerializer)
+        self.assertFalse(serializer.allow_empty)
+        self.assertFalse(hasattr(GuardedBookSerializer.Meta,
+                                 'list_serializer_class'))
+
+    def test_decisions_are_reused(self):
+        request = self.get_request('anton')
+        book = Book.objects.get(title="anton's book")
+        get_request_cache(request).set('testapp.access_own_book', book, False)
+        data = GuardedBookSerializer(book, context={'request': request}).data
+        self.assertNotIn('title', data)
+
+    def test_fields_are_omitted_without_request(self):
+        data = GuardedBookSerializer(Book.objects.first()).data
+        self.assertNotIn('title', data)
+        self.assertIn('author', data)
@@ -0,0 +1,92 @@
+from __future__ import absolute_import
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.shortcuts import reverse
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_rules import checks
+from rest_framework_rules.checks import check_snapshot_cache
+from rest_framework_rules.evaluation import PermissionChecker
+from rest_framework_rules.signals import permission_checked
+from rest_framework_rules.snapshots import (PermissionSnapshot,
+                                            invalidate_snapshots,
+                                            store_snapshot)
+from testapp import views
+
+
+class PermissionSnapshotTests(APITestCase):
+
+    """Tests the snapshots of the permissions not involving an object
+    """
+
+    def setUp(self):
+        self.anton = User.objects.get(username='anton')
+
+    def test_snapshot_holds_permissions_without_object(self):
+        snapshot = PermissionSnapshot.take(self.anton)
+        self.assertTrue(snapshot.get('testapp.list_books'))
+        self.assertIsNone(snapshot.get('testapp.access_own_book'))
+
+    def test_stale_snapshots_are_not_loaded(self):
+        data = PermissionSnapshot.take(self.anton).dump()
+        self.assertIsNotNone(PermissionSnapshot.load(data, self.anton))
+        invalidate_snapshots()
+        self.assertIsNone(PermissionSnapshot.load(data, self.anton))
+
+    def test_expired_snapshots_are_not_loaded(self):
+        data = PermissionSnapshot.take(self.anton).dump()
+        data['taken_at'] -= 60
+        self.assertIsNotNone(PermissionSnapshot.load(data, self.anton))
+        self.assertIsNone(PermissionSnapshot.load(data, self.anton,
+                                                  max_age=30))
+        with override_settings(REST_FRAMEWORK_RULES_SNAPSHOT_MAX_AGE=30):
+            self.assertIsNone(PermissionSnapshot.load(data, self.anton))
+        del data['taken_at']
+        self.assertIsNone(PermissionSnapshot.load(data, self.anton))
+
+    def test_snapshots_of_other_users_are_not_loaded(self):
+        data = PermissionSnapshot.take(self.anton).dump()
+        beatrix = User.objects.get(username='beatrix')
+        self.assertIsNone(PermissionSnapshot.load(data, beatrix))
+
+    def test_checker_answers_from_snapshot(self):
+        snapshot = PermissionSnapshot(self.anton.pk, 1,
+                                      granted=[], denied=['testapp.list_books'])
+        request = type('Request', (), {'user': self.anton})()
+        checker = PermissionChecker(request, snapshot=snapshot)
+        self.assertFalse(checker.has_perm('testapp.list_books'))
+
+    def test_view_uses_snapshot_taken_at_login(self):
+        user_logged_in.connect(store_snapshot)
+        self.addCleanup(user_logged_in.disconnect, store_snapshot)
+        checked = []
+        receiver = lambda sender, **kwargs: checked.append(kwargs['permission'])
+        permission_checked.connect(receiver, sender=views.SnapshotPermissionView)
+        self.addCleanup(permission_checked.disconnect, receiver,
+                        sender=views.SnapshotPermissionView)
+
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.get(reverse('snapshot_permission_view'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], checked)
+
+        invalidate_snapshots()
+        response = self.client.get(reverse('snapshot_permission_view'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(['testapp.list_books'], checked)
+
+
+class SnapshotCacheCheckTests(APITestCase):
+
+    def test_process_local_cache_is_a_warning(self):
+        warnings = check_snapshot_cache()
+        self.assertEqual(['rest_framework_rules.W002'],
+                         [warning.id for warning in warnings])
+        self.assertIs(views.SnapshotPermissionView, warnings[0].obj)
+
+    def test_shared_cache_passes(self):
+        with mock.patch.object(checks, 'caches', {'default': object()}):
+            self.assertEqual([], check_snapshot_cache())
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+import rules
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_rules.evaluation import PermissionChecker
+from rest_framework_rules.tracing import get_traces, trace_permission
+from testapp import views
+
+
+class TracingTests(TestCase):
+
+    """Tests the tracing of the predicates' evaluation
+    """
+
+    def setUp(self):
+        self.anton = User.objects.get(username='anton')
+        self.beatrix = User.objects.get(username='beatrix')
+
+    def test_short_circuited_operands_are_not_evaluated(self):
+        permission_trace = trace_permission(
+            self.anton, 'testapp.access_multiple_permissions_view_2')
+        self.assertTrue(permission_trace.allowed)
+        root = permission_trace.root
+        self.assertEqual('OR', root.op)
+        self.assertEqual(['is_anton', 'is_beatrix'],
+                         [child.name for child in root.children])
+        self.assertTrue(root.children[0].result)
+        self.assertTrue(root.children[1].short_circuited)
+
+    def test_nodes_hold_result_and_metrics(self):
+        permission_trace = trace_permission(
+            self.beatrix, 'testapp.access_multiple_permissions_view_2')
+        self.assertTrue(permission_trace.allowed)
+        root = permission_trace.root
+        self.assertEqual([False, True],
+                         [child.result for child in root.children])
+        # the queries are not counted by django < 2.0
+        self.assertIn(root.queries, (0, None))
+        self.assertGreaterEqual(root.duration, root.children[0].duration)
+        self.assertIn('is_beatrix: True', permission_trace.format())
+
+    def test_superusers_are_not_traced(self):
+        admin = User(username='admin', is_superuser=True)
+        permission_trace = trace_permission(
+            admin, 'testapp.access_multiple_permissions_view_2')
+        self.assertTrue(permission_trace.allowed)
+        self.assertIsNone(permission_trace.root)
+
+    def test_checker_records_traces_on_request(self):
+        request = type('Request', (), {'user': self.beatrix})()
+        checker = PermissionChecker(request, trace=True)
+        self.assertFalse(checker.has_perm(
+            'testapp.access_multiple_permissions_view_1'))
+        self.assertEqual(['testapp.access_multiple_permissions_view_1'],
+                         [trace.permission for trace in get_traces(request)])
+
+    def test_backend_permissions_are_granted(self):
+        rules.add_perm('testapp.change_book', rules.is_staff)
+        self.addCleanup(rules.remove_perm, 'testapp.change_book')
+        user = User.objects.create_user('carl')
+        user.user_permissions.add(
+            Permission.objects.get(codename='change_book'))
+
+        request = type('Request', (), {'user': user})()
+        checker = PermissionChecker(request, trace=True)
+        self.assertTrue(checker.has_perm('testapp.change_book'))
+        permission_trace, = get_traces(request)
+        self.assertTrue(permission_trace.allowed)
+        self.assertFalse(permission_trace.root.result)
+
+    def test_checker_without_trace_records_nothing(self):
+        request = type('Request', (), {'user': self.beatrix})()
+        PermissionChecker(request).has_perm(
+            'testapp.access_multiple_permissions_view_1')
+        self.assertEqual([], get_traces(request))
+
+    def test_view_logs_traces(self):
+        view = views.InstrumentedView.as_view(trace_permissions=True)
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.anton)
+        with self.assertLogs('rest_framework_rules.tracing', 'DEBUG') as logs:
+            response = view(request)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, len(logs.records))
@@ -0,0 +1,75 @@
+from __future__ import absolute_import
+
+from unittest import skipUnless
+
+import rules
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from testapp.models import Book
+
+try:
+    from asgiref.sync import async_to_sync
+    from testapp import async_views
+except ImportError:
+    async_views = None
+
+
+@skipUnless(async_views, 'asynchronous views require adrf')
+class AsyncViewTests(TestCase):
+
+    """Tests the permission checks of the asynchronous views of adrf
+    """
+
+    def get(self, view, username, **kwargs):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, User.objects.get(username=username))
+        # runs the sync parts of the view in this thread, which sees the
+        # test's transaction
+        return async_to_sync(view)(request, **kwargs)
+
+    def record(self, view, name):
+        calls = []
+        check = getattr(view, name)
+
+        async def recorded(self, *args):
+            calls.append(args)
+            return await check(self, *args)
+
+        setattr(view, name, recorded)
+        self.addCleanup(delattr, view, name)
+        return calls
+
+    def test_mixin_awaits_permission_checks(self):
+        view = async_views.AsyncPermissionView
+        calls = self.record(view, 'acheck_permissions')
+        object_calls = self.record(view, 'acheck_object_permissions')
+        book = Book.objects.get(title="anton's book")
+        response = self.get(view.as_view(), 'anton', pk=book.pk)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(book, object_calls[0][1])
+
+    def test_mixin_denies_missing_permissions(self):
+        book = Book.objects.get(title="anton's book")
+        response = self.get(async_views.AsyncPermissionView.as_view(),
+                            'beatrix', pk=book.pk)
+        self.assertEqual(403, response.status_code)
+        self.assertEqual('MISSING: testapp.access_async_view',
+                         response.data['detail'])
+
+    def test_mixin_awaits_object_permission_checks(self):
+        rules.add_perm('testapp.access_async_view_beatrix', rules.always_allow)
+        self.addCleanup(rules.remove_perm, 'testapp.access_async_view_beatrix')
+        view = async_views.AsyncPermissionView.as_view(
+            permission_required='testapp.access_async_view_beatrix')
+        book = Book.objects.get(title="anton's book")
+        response = self.get(view, 'beatrix', pk=book.pk)
+        self.assertEqual(403, response.status_code)
+        self.assertEqual('MISSING: testapp.access_own_book',
+                         response.data['detail'])
+
+    def test_decorated_async_handler_is_awaited(self):
+        view = async_views.AsyncDecoratedViewSet.as_view({'get': 'list'})
+        self.assertEqual(200, self.get(view, 'anton').status_code)
+        self.assertEqual(403, self.get(view, 'beatrix').status_code)
@@ -1,10 +1,18 @@
 from __future__ import absolute_import
 
+from unittest import mock
+
 import rules
 from django.contrib.auth.models import User
 from django.core.exceptions import ImproperlyConfigured
 from django.shortcuts import reverse
-from rest_framework.test import APITestCase
+from django.test import override_settings
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_rules import filters
+from rest_framework_rules.cache import get_request_cache
+from rest_framework_rules.signals import permission_checked
 from testapp.models import Book
 from testapp import views
 
@@ -114,3 +122,182 @@ class PermissionRequiredMixedGenericAPIViewTests(APITestCase):
         self.assertTrue(self.client.login(username='carlos', password='secr3t'))
         response = self.client.post(reverse('multiple_permissions_generic_view', args=(1,)))
         self.assertEqual(403, response.status_code)
+
+
+class PermissionRequiredCachedGenericAPIViewTests(APITestCase):
+
+    """Tests the behavior of the mixin when caching the permission decisions
+    """
+
+    def test_user_with_object_permissions_gets_access_to_object(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.post(reverse('cached_permissions_generic_view', args=(1,)))
+        self.assertEqual(200, response.status_code)
+
+    def test_user_with_partial_object_permissions_gets_no_access_to_object(self):
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.post(reverse('cached_permissions_generic_view', args=(1,)))
+        self.assertEqual(403, response.status_code)
+
+
+class PermissionRequiredCachedObjectGenericAPIViewTests(APITestCase):
+
+    """Tests the behavior of the mixin when memoizing the fetched object
+    """
+
+    def setUp(self):
+        request = Request(APIRequestFactory().get('/'))
+        request.user = User.objects.get(username='anton')
+        self.view = views.CachedObjectGenericView(
+            request=request, kwargs={'pk': 1}, format_kwarg=None)
+
+    def test_object_is_fetched_and_checked_once(self):
+        with mock.patch.object(self.view, 'check_object_permissions',
+                               wraps=self.view.check_object_permissions) as check:
+            with self.assertNumQueries(1):
+                obj = self.view.get_object()
+                self.assertIs(obj, self.view.get_object())
+        self.assertEqual(1, check.call_count)
+
+    def test_invalidated_object_is_fetched_again(self):
+        obj = self.view.get_object()
+        self.view.invalidate_object()
+        self.assertIsNone(get_request_cache(self.view.request).get(
+            'testapp.access_single_permission_object', obj))
+        with self.assertNumQueries(1):
+            self.assertIsNot(obj, self.view.get_object())
+
+
+class ObjectPermissionsFilterTests(APITestCase):
+
+    """Tests the object permissions filter backend
+    """
+
+    def setUp(self):
+        self.dora = User.objects.create_user('dora', password='secr3t')
+        self.emil = User.objects.create_user('emil', password='secr3t')
+        self.book = Book.objects.create(title='Momo', author=self.dora)
+        Book.objects.create(title='Emil und die Detektive', author=self.emil)
+
+    def test_user_gets_permitted_objects_only(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        response = self.client.get(reverse('filtered_books_view'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([self.book.pk], [book['id'] for book in response.data])
+
+    def test_detail_requests_are_left_to_the_object_permissions(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        with mock.patch.object(filters, 'get_permitted_queryset') as filtered:
+            response = self.client.get(
+                reverse('filtered_book_view', args=[self.book.pk]))
+            self.assertEqual(200, response.status_code)
+            denied = Book.objects.get(title='Emil und die Detektive')
+            response = self.client.get(
+                reverse('filtered_book_view', args=[denied.pk]))
+            self.assertEqual(403, response.status_code)
+        self.assertFalse(filtered.called)
+
+    def test_many_evaluated_objects_are_returned_as_a_list(self):
+        books = Book.objects.all()
+        with mock.patch.object(filters, 'permissions_to_q',
+                               return_value=None):
+            self.assertEqual(
+                [self.book.pk],
+                [book.pk for book in filters.get_permitted_queryset(
+                    self.dora, ('testapp.access_own_book', ), books)])
+            with mock.patch.object(filters, 'get_max_query_params',
+                                   return_value=0):
+                self.assertEqual(
+                    [self.book],
+                    filters.get_permitted_queryset(
+                        self.dora, ('testapp.access_own_book', ), books))
+
+    def test_get_permitted_objects_filters_a_page(self):
+        request = type('Request', (), {'user': self.dora})()
+        books = list(Book.objects.all())
+        self.assertEqual([self.book],
+                         views.FilteredBooksView().get_permitted_objects(request, books))
+
+
+class BulkObjectPermissionsTests(APITestCase):
+
+    """Tests the checks of the object permissions on many objects
+    """
+
+    def setUp(self):
+        self.dora = User.objects.create_user('dora', password='secr3t')
+        self.emil = User.objects.create_user('emil', password='secr3t')
+        self.momo = Book.objects.create(title='Momo', author=self.dora)
+        self.emil_book = Book.objects.create(title='Emil und die Detektive',
+                                             author=self.emil)
+        self.request = Request(APIRequestFactory().get('/'))
+        self.request.user = self.dora
+        self.view = views.FilteredBooksView(request=self.request, kwargs={},
+                                            format_kwarg=None)
+
+    def test_permitted_objects_pass(self):
+        self.assertIsNone(self.view.check_bulk_object_permissions(
+            self.request, Book.objects.filter(author=self.dora)))
+
+    def test_denials_are_reported_per_object(self):
+        with self.assertRaises(PermissionDenied) as context:
+            self.view.check_bulk_object_permissions(
+                self.request,
+                Book.objects.filter(pk__in=[self.momo.pk, self.emil_book.pk]))
+        detail = context.exception.detail
+        self.assertEqual({str(self.emil_book.pk)},
+                         {str(pk) for pk in detail['objects']})
+        self.assertEqual(['testapp.access_own_book'],
+                         list(detail['objects'].values())[0])
+
+    def test_objects_without_primary_key_are_reported_by_index(self):
+        books = [Book(title='Momo', author=self.dora),
+                 Book(title='Pünktchen und Anton', author=self.emil)]
+        self.assertEqual({1: ['testapp.access_own_book']},
+                         self.view.get_bulk_denials(self.request, books))
+
+    def test_permissions_are_evaluated_once_per_object(self):
+        books = list(Book.objects.all())
+        with mock.patch('rest_framework_rules.predicates.has_perm_many',
+                        return_value=[True] * len(books)) as has_perm_many:
+            self.assertEqual({}, self.view.get_bulk_denials(self.request,
+                                                            books))
+        self.assertEqual(1, has_perm_many.call_count)
+
+
+class PermissionInstrumentationTests(APITestCase):
+
+    """Tests the metrics reported for the evaluated permissions
+    """
+
+    def setUp(self):
+        self.metrics = []
+        permission_checked.connect(self.receive, sender=views.InstrumentedView)
+        self.addCleanup(permission_checked.disconnect, self.receive,
+                        sender=views.InstrumentedView)
+
+    def receive(self, sender, **kwargs):
+        self.metrics.append(kwargs)
+
+    def test_signal_is_sent_per_evaluated_permission(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.get(reverse('instrumented_view'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {'testapp.access_multiple_permissions_view_1',
+             'testapp.access_multiple_permissions_view_2'},
+            {metric['permission'] for metric in self.metrics})
+        self.assertTrue(all(metric['allowed'] for metric in self.metrics))
+
+    @override_settings(DEBUG=True)
+    def test_debug_header_lists_evaluated_permissions(self):
+        self.assertTrue(self.client.login(username='carlos', password='secr3t'))
+        response = self.client.get(reverse('instrumented_view'))
+        self.assertEqual(403, response.status_code)
+        self.assertIn('allowed=0', response['X-Permission-Timing'])
+
+    @override_settings(DEBUG=False)
+    def test_debug_header_is_omitted_without_debug(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.get(reverse('instrumented_view'))
+        self.assertFalse(response.has_header('X-Permission-Timing'))
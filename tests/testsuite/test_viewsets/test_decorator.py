@@ -180,3 +180,25 @@ class DecoratedCustomRouteViewSetTests(APITestCase):
         self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
         response = self.client.post(reverse('decorated_custom_route-multiple-permissions-detail-route', args=(1, )))
         self.assertEqual(403, response.status_code)
+
+
+class DecoratedGenericViewSetTests(APITestCase):
+
+    """Tests passing the object resolved by the decorator to the viewset
+    """
+
+    def setUp(self):
+        self.dora = User.objects.create_user('dora', password='secr3t')
+        self.emil = User.objects.create_user('emil', password='secr3t')
+        self.book = Book.objects.create(title='Momo', author=self.dora)
+
+    def test_get_object_reuses_resolved_object(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        response = self.client.get(reverse('decorated_generic_viewset-detail', args=(self.book.pk,)))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'pk': self.book.pk, 'reused': True}, response.data)
+
+    def test_user_without_object_permission_gets_no_access(self):
+        self.assertTrue(self.client.login(username='emil', password='secr3t'))
+        response = self.client.get(reverse('decorated_generic_viewset-detail', args=(self.book.pk,)))
+        self.assertEqual(403, response.status_code)
@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
+import rules
 from django.contrib.auth.models import User
 from django.core.exceptions import ImproperlyConfigured
 from django.shortcuts import reverse
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 from testapp import viewsets
+from testapp.models import Book
 
 
 class PermissionRequiredMixedViewSetTests(APITestCase):
@@ -111,3 +114,99 @@ class PermissionRequiredMixedGenericViewSetTests(APITestCase):
         self.assertTrue(self.client.login(username='carlos', password='secr3t'))
         response = self.client.post(reverse('multiple_permissions_generic_viewset-detail', args=(1,)))
         self.assertEqual(403, response.status_code)
+
+
+class ScopedQuerysetGenericViewSetTests(APITestCase):
+
+    """Tests the scoping of the queryset by the object permissions
+    """
+
+    def setUp(self):
+        self.dora = User.objects.create_user('dora', password='secr3t')
+        self.emil = User.objects.create_user('emil', password='secr3t')
+        self.book = Book.objects.create(title='Momo', author=self.dora)
+        self.other_book = Book.objects.create(title='Emil und die Detektive',
+                                              author=self.emil)
+
+    def test_user_lists_permitted_objects_only(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        response = self.client.get(reverse('scoped_generic_viewset-list'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([self.book.pk], [book['id'] for book in response.data])
+
+    def test_user_gets_permitted_object(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        response = self.client.get(reverse('scoped_generic_viewset-detail', args=(self.book.pk,)))
+        self.assertEqual(200, response.status_code)
+
+    def test_user_does_not_find_other_objects(self):
+        self.assertTrue(self.client.login(username='dora', password='secr3t'))
+        response = self.client.get(reverse('scoped_generic_viewset-detail', args=(self.other_book.pk,)))
+        self.assertEqual(404, response.status_code)
+
+    def get_viewset(self, **kwargs):
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.dora
+        return viewsets.ScopedGenericViewSet(request=request, kwargs=kwargs,
+                                             format_kwarg=None)
+
+    def test_detail_queryset_selects_permission_related(self):
+        queryset = self.get_viewset(pk=self.book.pk).get_queryset()
+        self.assertEqual({'author': {}}, queryset.query.select_related)
+
+    def test_list_queryset_does_not_select_permission_related(self):
+        queryset = self.get_viewset().get_queryset()
+        self.assertFalse(queryset.query.select_related)
+
+    def test_detail_queryset_is_narrowed_before_evaluation(self):
+        evaluated = []
+
+        @rules.predicate
+        def is_recorded(user, target):
+            evaluated.append(target)
+            return True
+
+        rules.add_perm('testapp.test_recorded', is_recorded)
+        self.addCleanup(rules.remove_perm, 'testapp.test_recorded')
+        viewset = self.get_viewset(pk=self.book.pk)
+        viewset.object_permission_required = ('testapp.test_recorded', )
+        with self.assertLogs('rest_framework_rules.filters', 'WARNING'):
+            self.assertEqual([self.book], list(viewset.get_queryset()))
+        self.assertEqual([self.book], evaluated)
+
+    def test_object_permissions_do_not_query_related_objects(self):
+        viewset = self.get_viewset(pk=self.book.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.book, viewset.get_object())
+
+
+class MappedPermissionsGenericViewSetTests(APITestCase):
+
+    """Tests the permissions mapped to the actions and methods of a viewset
+    """
+    def test_action_permissions_are_required(self):
+        self.assertTrue(self.client.login(username='carlos', password='secr3t'))
+        response = self.client.get(reverse('mapped_permissions_generic_viewset-list'))
+        self.assertEqual(200, response.status_code)
+
+    def test_method_permissions_are_required(self):
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.post(reverse('mapped_permissions_generic_viewset-list'))
+        self.assertEqual(403, response.status_code)
+
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.post(reverse('mapped_permissions_generic_viewset-list'))
+        self.assertEqual(200, response.status_code)
+
+    def test_fallback_permissions_are_required(self):
+        self.assertTrue(self.client.login(username='carlos', password='secr3t'))
+        response = self.client.get(reverse('mapped_permissions_generic_viewset-detail', args=(3,)))
+        self.assertEqual(403, response.status_code)
+
+    def test_action_object_permissions_are_required(self):
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.get(reverse('mapped_permissions_generic_viewset-detail', args=(2,)))
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.get(reverse('mapped_permissions_generic_viewset-detail', args=(1,)))
+        self.assertEqual(403, response.status_code)
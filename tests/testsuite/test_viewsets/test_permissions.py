@@ -0,0 +1,141 @@
+from __future__ import absolute_import
+
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+from django.test import TestCase
+from django.utils.encoding import force_str
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_rules import permissions
+from rest_framework_rules.permissions import (PermissionMap, RulesPermission,
+                                              get_permission_table,
+                                              normalize_permissions)
+from testapp import views, viewsets
+
+
+class PermissionMapTests(TestCase):
+
+    def test_mappings_are_normalized(self):
+        perms = normalize_permissions({'list': 'testapp.list_books',
+                                       '*': ['testapp.access_own_book']})
+        self.assertIsInstance(perms, PermissionMap)
+        self.assertEqual({'list': ('testapp.list_books', ),
+                          '*': ('testapp.access_own_book', )}, perms)
+
+    def test_action_takes_precedence_over_method(self):
+        perms = normalize_permissions({'list': 'testapp.list_books',
+                                       'GET': 'testapp.access_own_book'})
+        self.assertEqual(('testapp.list_books', ), perms.resolve('list', 'GET'))
+        self.assertEqual(('testapp.access_own_book', ),
+                         perms.resolve('retrieve', 'GET'))
+        self.assertIsNone(perms.resolve('create', 'POST'))
+
+    def test_fallback_applies_to_other_actions(self):
+        perms = normalize_permissions({'list': 'testapp.list_books',
+                                       '*': 'testapp.access_own_book'})
+        self.assertEqual(('testapp.access_own_book', ),
+                         perms.resolve('create', 'POST'))
+
+
+class RulesPermissionViewSetTests(APITestCase):
+
+    """Tests the behavior of the permission class when used on a ViewSet
+    """
+    def test_permission_table_holds_route_permissions(self):
+        table = get_permission_table(viewsets.RulesPermissionViewSet)
+        self.assertEqual((('testapp.list_books', ),
+                          ('testapp.access_own_book', )),
+                         table[None])
+        self.assertEqual((('testapp.access_single_permission_detail_route', ),
+                          ('testapp.access_own_book', )),
+                         table['publish'])
+
+    def test_anonymous_user_gets_no_access(self):
+        response = self.client.get(reverse('rules_permission_viewset-list'))
+        self.assertEqual(403, response.status_code)
+
+    def test_user_with_permission_gets_access(self):
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.get(reverse('rules_permission_viewset-list'))
+        self.assertEqual(200, response.status_code)
+
+    def test_user_with_object_permission_gets_access_to_object(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.get(reverse('rules_permission_viewset-detail', args=(1,)))
+        self.assertEqual(200, response.status_code)
+
+    def test_user_without_object_permission_gets_no_access_to_object(self):
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.get(reverse('rules_permission_viewset-detail', args=(1,)))
+        self.assertEqual(403, response.status_code)
+        self.assertIn('MISSING: testapp.access_own_book',
+                      force_str(response.content))
+
+    def test_route_permissions_are_checked(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        response = self.client.post(reverse('rules_permission_viewset-publish', args=(1,)))
+        self.assertEqual(200, response.status_code)
+
+        self.assertTrue(self.client.login(username='beatrix', password='secr3t'))
+        response = self.client.post(reverse('rules_permission_viewset-publish', args=(1,)))
+        self.assertEqual(403, response.status_code)
+
+    def test_route_permissions_are_read_from_the_table(self):
+        self.assertTrue(self.client.login(username='anton', password='secr3t'))
+        with mock.patch.object(permissions, 'normalize_permissions',
+                               wraps=normalize_permissions) as normalize:
+            response = self.client.post(
+                reverse('rules_permission_viewset-publish', args=(1,)))
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(normalize.called)
+
+    @skipUnless(hasattr(BasePermission, '__or__'),
+                'permission operators require djangorestframework 3.9')
+    def test_permission_composes_with_other_permissions(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com',
+                                             'secr3t')
+        user.is_superuser = False
+        user.save()
+
+        permission = (IsAdminUser | RulesPermission)()
+        view = viewsets.RulesPermissionViewSet()
+        view.action = 'publish'
+        request = type('Request', (), {'user': user})()
+        self.assertTrue(permission.has_permission(request, view))
+
+
+class RulesPermissionViewTests(APITestCase):
+
+    """Tests the behavior of the permission class when used on an APIView
+    """
+    def get(self, view, username):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, User.objects.get(username=username))
+        return view(request)
+
+    def test_as_view_arguments_are_checked(self):
+        view = views.RulesPermissionView.as_view(
+            permission_required='testapp.access_single_permission_view')
+        self.assertEqual(200, self.get(view, 'anton').status_code)
+        response = self.get(view, 'beatrix')
+        self.assertEqual(403, response.status_code)
+        self.assertIn('MISSING: testapp.access_single_permission_view',
+                      force_str(response.render().content))
+
+    def test_class_attributes_are_checked_without_arguments(self):
+        view = views.RulesPermissionView.as_view()
+        self.assertEqual(200, self.get(view, 'beatrix').status_code)
+
+    def test_property_permissions_are_checked(self):
+        view = views.RulesPermissionPropertyView.as_view()
+        self.assertEqual(200, self.get(view, 'anton').status_code)
+        self.assertEqual(403, self.get(view, 'beatrix').status_code)
+
+    def test_get_permission_required_is_called(self):
+        class View(views.RulesPermissionView):
+            def get_permission_required(self):
+                return ('testapp.access_single_permission_view', )
+
+        self.assertEqual(403, self.get(View.as_view(), 'beatrix').status_code)